@@ -1,26 +1,47 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 import uvicorn
 import json
 import os
 import asyncio
 import uuid
 import threading
+import concurrent.futures
+import random
+import time
 from dotenv import load_dotenv
-from collections import defaultdict
 from enum import Enum
-from scraper_agents import ScrapingAgent, EllisphereAgent, OpenAICompiler
+from scraper_agents import ScrapingAgent, ScraperTimeout, BrowserCapacityTimeout, EllisphereAgent, OpenAICompiler
+from config.model import model_metrics
+from config.scrapers import limits_for, TASK_DEADLINE_SECONDS
+from storage import create_task_backend, FINISHED_STATUSES, TASK_FIELDS, SourceCache
 from tasks import infogreffe_task, pappers_scrape_task, societe_scrape_task, google_task
-from helpers import get_year_data, get_years_from_ellisphere, get_detailed_report_data, get_companies_from_societe_api, parse_periods_from_file, get_available_years_from_file
+from helpers import get_year_data, get_years_from_ellisphere, get_detailed_report_data, get_companies_from_societe_api, parse_periods_from_file, get_available_years_from_file, llm_rate_limiter, current_task_id, submit_to_shared_loop, init_llm_clients, close_llm_clients, task_cancellation, TaskCancelled, scrape_key, siren_of, worker_pool, TaskPreempted, PRIORITY_CLASSES, domain_limiter, source_breaker, CircuitOpen, is_transient, scraper_hedger, concurrency_controller, browser_memory, BrowserMemoryExceeded, browser_lifecycle, browser_profiles
 
 load_dotenv()
 
 app = FastAPI()
 
-# In-memory storage for task results
-task_results = defaultdict(dict)
+# Task state backend, in-process by default or shared between workers (TASK_STATE_BACKEND)
+task_store = create_task_backend()
 
-# Task execution lock
-task_lock = threading.Lock()
+# Per-source results by SIREN, reused by later scrapes while fresh
+source_cache = SourceCache()
+
+# Seconds between keep-alive comments on idle task event streams
+TASK_EVENTS_KEEPALIVE = float(os.getenv("TASK_EVENTS_KEEPALIVE", "15"))
+
+# Longest `wait` accepted by /get-task-status for long-polling, in seconds
+TASK_STATUS_MAX_WAIT = float(os.getenv("TASK_STATUS_MAX_WAIT", "60"))
+
+# Seconds between checks for a cancellation made by another worker
+TASK_CANCEL_CHECK_INTERVAL = float(os.getenv("TASK_CANCEL_CHECK_INTERVAL", "1"))
+
+# Most companies accepted by one /scrape-batch request
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+
+# Number of uvicorn worker processes, only supported with a shared task backend
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
 
 
 class TaskStatus(Enum):
@@ -31,41 +52,263 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"
 
 
+# Sources scraped for every company, part of the key used to coalesce identical scrapes
+PIPELINE_SOURCES = ("infogreffe", "pappers", "societe", "ellisphere", "google")
+
+
 def run_async(coro):
-    """Helper function to run async functions"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    """
+    Helper function to run async functions on the shared event loop.
+    Inside a task, the coroutine is cancelled (and TaskCancelled raised) as
+    soon as the task is cancelled, on this worker or on another one.
+    """
+    task_id = current_task_id.get()
+    future = submit_to_shared_loop(coro)
+    if task_id is None:
+        return future.result()
+
+    task_cancellation.track(task_id, future)
     try:
-        return loop.run_until_complete(coro)
+        while True:
+            done, _ = concurrent.futures.wait([future], timeout=TASK_CANCEL_CHECK_INTERVAL)
+            if done:
+                try:
+                    return future.result()
+                except concurrent.futures.CancelledError:
+                    raise TaskCancelled(task_id)
+            if is_cancelled(task_id):
+                future.cancel()
     finally:
-        loop.close()
+        task_cancellation.untrack(task_id, future)
+
+
+def is_cancelled(task_id):
+    """Whether a task was cancelled here or, with a shared backend, by another worker"""
+    if task_cancellation.is_cancelled(task_id):
+        return True
+    snapshot = task_store.get_snapshot(task_id)
+    return snapshot is not None and snapshot.status == TaskStatus.CANCELLED.value
+
+
+def scraper_budget(name, deadline):
+    """Timeout and max steps of a scraper, capped by what is left of the task deadline"""
+    limits = limits_for(name)
+    return min(limits["timeout"], deadline - time.monotonic()), limits["max_steps"]
+
+
+def timed_out_result(scraper_config, error):
+    """Keep a timed out scraper's partial output, or record the timeout"""
+    message = f"{scraper_config['display_name']} scraper timed out: {str(error)}"
+    print(f"Warning: {message}")
+    if error.partial_result:
+        return error.partial_result
+    return {"error": message, "status": "timed_out"}
+
+
+def circuit_open_result(scraper_config, error, siren, cache_statuses):
+    """Stand in for a source skipped by its circuit breaker: its last cached result, or the error"""
+    stale = stale_source_result(scraper_config["name"], siren, cache_statuses)
+    if stale is not None:
+        print(f"Warning: {error}, using its result cached {int(stale[1])}s ago")
+        return stale[0]
+    message = f"{scraper_config['display_name']} scraper skipped: {str(error)}"
+    print(f"Warning: {message}")
+    return {"error": message, "status": "failed"}
+
+
+def cached_source_result(name, siren, max_age, cache_statuses):
+    """
+    Return (result, age) when the source cache has a fresh enough result for
+    this company, otherwise None, recording the hit or miss for scraper_statuses
+    """
+    cached = source_cache.get(name, siren, max_age)
+    if cached is None:
+        cache_statuses[name] = {"hit": False}
+    else:
+        cache_statuses[name] = {"hit": True, "age_seconds": int(cached[1])}
+    return cached
+
+
+def stale_source_result(name, siren, cache_statuses):
+    """Return (result, age) of an expired cache entry to stand in for a source that is down, or None"""
+    cached = source_cache.get(name, siren, stale=True)
+    if cached is not None:
+        cache_statuses[name] = {"hit": True, "age_seconds": int(cached[1]), "stale": True}
+    return cached
+
+
+def store_source_result(name, siren, result):
+    """Cache a source's result, unless it is empty or an error"""
+    if not result:
+        return
+    if isinstance(result, dict) and result.get("status") in ("failed", "no_data", "timed_out"):
+        return
+    source_cache.put(name, siren, result)
+
+
+def check_cancelled(task_id):
+    """Stop the pipeline between steps once the task is cancelled"""
+    if is_cancelled(task_id):
+        raise TaskCancelled(task_id)
+
+
+def sleep_unless_cancelled(task_id, seconds):
+    """Wait between retries, stopping early if the task is cancelled"""
+    end = time.monotonic() + seconds
+    while True:
+        check_cancelled(task_id)
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, TASK_CANCEL_CHECK_INTERVAL))
+
+
+def run_with_retries(task_id, name, attempt, deadline):
+    """
+    Call `attempt(timeout, max_steps)` for a source until it succeeds,
+    retrying transient errors with exponential backoff while the task
+    deadline allows. Every attempt goes through the source's circuit breaker,
+    which raises CircuitOpen instead of calling a source that keeps failing.
+    """
+    policy = limits_for(name)
+    for retry in range(policy["retries"] + 1):
+        timeout, max_steps = scraper_budget(name, deadline)
+        if timeout <= 0:
+            raise ScraperTimeout("Task deadline reached before it started")
+        if not source_breaker.allow(name):
+            raise CircuitOpen(name)
+        try:
+            result = attempt(timeout, max_steps)
+        except (TaskCancelled, BrowserCapacityTimeout, BrowserMemoryExceeded):
+            # No outcome for the source: cancelled, no browser free on this host, or killed by our memory cap
+            source_breaker.abandon(name)
+            raise
+        except ScraperTimeout as e:
+            # Out of budget, so not retried; a timeout with nothing gathered counts against the source
+            if e.partial_result is None:
+                source_breaker.record_failure(name)
+            else:
+                source_breaker.record_success(name)
+            raise
+        except Exception as e:
+            source_breaker.record_failure(name)
+            backoff = policy["retry_backoff"] * 2 ** retry * random.uniform(0.5, 1.0)
+            if not is_transient(e) or retry == policy["retries"] or time.monotonic() + backoff >= deadline:
+                raise
+            print(f"Warning: {name} scraper failed ({str(e)}), retrying in {backoff:.1f}s")
+            sleep_unless_cancelled(task_id, backoff)
+        else:
+            source_breaker.record_success(name)
+            return result
+
+
+def check_preempted(task_id):
+    """Give the worker to waiting interactive tasks between scrapers of a bulk task"""
+    if worker_pool.preempt_requested():
+        raise TaskPreempted(task_id)
+
+
+@app.on_event("startup")
+def startup():
+    """
+    Create the shared LLM clients once for every agent, restart unfinished
+    tasks, start adjusting the browser concurrency limits and reap browsers
+    left behind by crashed workers
+    """
+    init_llm_clients()
+    for task_id, company_id, id_type, priority in task_store.claim_unfinished():
+        print(f"Restarting unfinished task {task_id}")
+        restart_task(task_id, company_id, id_type, priority)
+    task_store.watch_orphans(restart_task)
+    concurrency_controller.start()
+    browser_lifecycle.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    close_llm_clients()
 
 
 def update_task_status(task_id, status, data=None, error=None, progress=None, scraper_statuses=None):
     """Thread-safe update of task status"""
-    with task_lock:
-        if data is not None:
-            task_results[task_id].update({
-                "status": status,
-                "data": data
-            })
-        elif error is not None:
-            task_results[task_id].update({
-                "status": status,
-                "error": error
-            })
-        else:
-            task_results[task_id]["status"] = status
+    task_store.update(task_id, status, data=data, error=error,
+                      progress=progress, scraper_statuses=scraper_statuses)
+
 
-        if progress is not None:
-            task_results[task_id]["progress"] = progress
-            
-        if scraper_statuses is not None:
-            task_results[task_id]["scraper_statuses"] = scraper_statuses
+# Tasks whose pipeline is running in this process
+running_tasks = set()
+running_tasks_lock = threading.Lock()
 
 
-def process_scraper(task_id, company_id, id_type):
-    """Process the scraper task"""
+def start_task(task_id, company_id, id_type, max_age=None, priority="interactive", reopen=False):
+    """
+    Queue the scraper pipeline of a task on the shared worker pool in a
+    priority class, unless it is already running here. With `reopen`, the
+    failed or cancelled task is first moved back to pending, which fails
+    while its previous pipeline is still stopping.
+    """
+    with running_tasks_lock:
+        if task_id in running_tasks:
+            return False
+        running_tasks.add(task_id)
+    if reopen and task_store.reopen(task_id) is None:
+        with running_tasks_lock:
+            running_tasks.discard(task_id)
+        return False
+    worker_pool.submit(process_scraper, task_id, company_id, id_type, max_age, priority=priority)
+    return True
+
+
+def restart_task(task_id, company_id, id_type, priority):
+    """Requeue a recovered task in the priority class it was submitted with"""
+    start_task(task_id, company_id, id_type, priority=priority if priority in PRIORITY_CLASSES else "interactive")
+
+
+def submit_scrape(company_id, id_type, max_age=None, priority="interactive"):
+    """
+    Start a scrape, or attach to the one already running for the same company
+    and sources. Returns (task_id, created).
+    """
+    task_id, created = task_store.create_or_attach(
+        str(uuid.uuid4()), TaskStatus.PENDING.value, company_id, id_type,
+        scrape_key=scrape_key(company_id, id_type, PIPELINE_SOURCES), priority=priority)
+    if created:
+        start_task(task_id, company_id, id_type, max_age, priority)
+    elif priority == "interactive":
+        promote_task(task_id)
+    return task_id, created
+
+
+def promote_task(task_id):
+    """
+    Move a bulk task an interactive request attached to into the interactive
+    class, so the analyst does not wait behind the rest of the batch
+    """
+    task_store.set_priority(task_id, "interactive")
+    worker_pool.promote(lambda queued_task_id, *args: queued_task_id == task_id, "interactive")
+
+
+def load_checkpoint(task_id, scraper_names):
+    """
+    Results of the scrapers that already completed for this task (published
+    after each scraper), so a restarted or resubmitted task skips them
+    """
+    record = task_store.get(task_id) or {}
+    data = record.get("data") or {}
+    statuses = record.get("scraper_statuses") or {}
+    return {name: data[name] for name in scraper_names if statuses.get(name) == "completed" and name in data}
+
+
+def process_scraper(task_id, company_id, id_type, max_age=None):
+    """
+    Process the scraper task, resuming from the scrapers already completed and
+    serving sources from the cache when their result is younger than `max_age`
+    (and the source's TTL)
+    """
+    # Tag every LLM call made for this task so the rate limiter can queue fairly
+    current_task_id.set(task_id)
+    scraper_statuses = {}
+    requeued = False
     try:
         # Define independent scrapers (run first)
         independent_scrapers = [
@@ -111,38 +354,72 @@ def process_scraper(task_id, company_id, id_type):
             len(independent_scrapers)
         progress_per_dependent = dependent_progress / len(dependent_scrapers)
 
+        # Resume from the results checkpointed before a crash or resubmission
+        results = load_checkpoint(task_id, [scraper["name"] for scraper in independent_scrapers + dependent_scrapers])
+        if results:
+            print(f"Resuming task {task_id}, skipping {', '.join(results)}")
+
         # Initialize scraper statuses - all start as running
-        scraper_statuses = {}
         all_scrapers = independent_scrapers + dependent_scrapers + [{"name": "compiled_report", "display_name": "Compiled Report"}]
         for scraper in all_scrapers:
-            scraper_statuses[scraper["name"]] = "running"
+            scraper_statuses[scraper["name"]] = "completed" if scraper["name"] in results else "running"
+        # Hit or miss, and age, of each source in the source cache
+        cache_statuses = {}
+        scraper_statuses["cache"] = cache_statuses
+        siren = siren_of(company_id, id_type)
 
         # Update the task status to running with initial scraper statuses
         update_task_status(task_id, TaskStatus.RUNNING.value, progress=0, scraper_statuses=scraper_statuses)
-
-        results = {}
+        deadline = time.monotonic() + TASK_DEADLINE_SECONDS
 
         # Phase 1: Run independent scrapers
         for i, scraper_config in enumerate(independent_scrapers):
+            check_cancelled(task_id)
+            if scraper_config["name"] in results:
+                # Completed before the restart
+                continue
+            check_preempted(task_id)
             # Update progress at start of each scraper
             current_progress = int(i * progress_per_independent)
             update_task_status(
                 task_id, TaskStatus.RUNNING.value, progress=current_progress, scraper_statuses=scraper_statuses)
 
             # Handle different scraper types with individual error handling
-            try:
+            def attempt(timeout, max_steps):
                 if scraper_config["name"] == "ellisphere":
                     # Ellisphere uses async functions, so use run_async helper
-                    result = run_async(scraper_config["task_function"](company_id))
-                else:
-                    # Standard scrapers use ScrapingAgent
+                    return run_async(process_ellisphere_with_timeout(company_id, timeout))
+                # Standard scrapers use ScrapingAgent, hedged by a second one when slow
+                def start(timeout):
                     agent = ScrapingAgent(
-                        scraper_config["task_function"](company_id, id_type))
-                    result = run_async(agent.scrape(company_id, id_type))
+                        scraper_config["task_function"](company_id, id_type), timeout=timeout, max_steps=max_steps,
+                        source=scraper_config["name"])
+                    return agent.scrape(company_id, id_type)
+                return run_async(scraper_hedger.run(scraper_config["name"], start, timeout))
+
+            cached = cached_source_result(scraper_config["name"], siren, max_age, cache_statuses)
+            try:
+                if cached is not None:
+                    result = cached[0]
+                else:
+                    result = run_with_retries(task_id, scraper_config["name"], attempt, deadline)
 
                 results[scraper_config["name"]] = result
                 # Mark scraper as completed successfully
                 scraper_statuses[scraper_config["name"]] = "completed"
+                if cached is None:
+                    store_source_result(scraper_config["name"], siren, result)
+            except TaskCancelled:
+                raise
+            except CircuitOpen as e:
+                # Skip the source while it is down, falling back to an expired cache entry
+                results[scraper_config["name"]] = circuit_open_result(scraper_config, e, siren, cache_statuses)
+                scraper_statuses[scraper_config["name"]] = (
+                    "completed" if cache_statuses[scraper_config["name"]].get("stale") else "failed")
+            except (ScraperTimeout, BrowserMemoryExceeded) as e:
+                # Keep what it gathered and go on with the other scrapers
+                results[scraper_config["name"]] = timed_out_result(scraper_config, e)
+                scraper_statuses[scraper_config["name"]] = "timed_out"
             except Exception as e:
                 # Log the error but continue with other scrapers
                 error_msg = f"Error in {scraper_config['display_name']} scraper: {str(e)}"
@@ -153,11 +430,16 @@ def process_scraper(task_id, company_id, id_type):
 
             # Update progress after completing this scraper
             completed_progress = int((i + 1) * progress_per_independent)
-            update_task_status(task_id, TaskStatus.RUNNING.value,
+            # Publish the partial results gathered so far
+            update_task_status(task_id, TaskStatus.RUNNING.value, data=results,
                                progress=completed_progress, scraper_statuses=scraper_statuses)
 
         # Phase 2: Run dependent scrapers
         for i, scraper_config in enumerate(dependent_scrapers):
+            check_cancelled(task_id)
+            if scraper_config["name"] in results:
+                continue
+            check_preempted(task_id)
             # Update progress at start of each dependent scraper
             current_progress = int(
                 independent_progress + (i * progress_per_dependent))
@@ -174,21 +456,42 @@ def process_scraper(task_id, company_id, id_type):
                 scraper_statuses[scraper_config["name"]] = "failed"
                 continue
 
-            try:
-                # Run dependent scraper with input data
-                if scraper_config["name"] == "google":
-                    # Google task needs parsed data as input (only one argument)
-                    agent = ScrapingAgent(
-                        scraper_config["task_function"](input_data))
-                    result = run_async(agent.scrape(input_data, id_type))
-                else:
+            # Run dependent scraper with input data
+            def attempt(timeout, max_steps):
+                def start(timeout):
+                    if scraper_config["name"] == "google":
+                        # Google task needs parsed data as input (only one argument)
+                        agent = ScrapingAgent(
+                            scraper_config["task_function"](input_data), workload="google_extraction",
+                            timeout=timeout, max_steps=max_steps, source=scraper_config["name"])
+                        return agent.scrape(input_data, id_type)
                     # Handle other dependent scrapers if added in future
                     agent = ScrapingAgent(
-                        scraper_config["task_function"](company_id, id_type))
-                    result = run_async(agent.scrape(company_id, id_type))
+                        scraper_config["task_function"](company_id, id_type), timeout=timeout, max_steps=max_steps,
+                        source=scraper_config["name"])
+                    return agent.scrape(company_id, id_type)
+                return run_async(scraper_hedger.run(scraper_config["name"], start, timeout))
+
+            cached = cached_source_result(scraper_config["name"], siren, max_age, cache_statuses)
+            try:
+                if cached is not None:
+                    result = cached[0]
+                else:
+                    result = run_with_retries(task_id, scraper_config["name"], attempt, deadline)
 
                 results[scraper_config["name"]] = result
                 scraper_statuses[scraper_config["name"]] = "completed"
+                if cached is None:
+                    store_source_result(scraper_config["name"], siren, result)
+            except TaskCancelled:
+                raise
+            except CircuitOpen as e:
+                results[scraper_config["name"]] = circuit_open_result(scraper_config, e, siren, cache_statuses)
+                scraper_statuses[scraper_config["name"]] = (
+                    "completed" if cache_statuses[scraper_config["name"]].get("stale") else "failed")
+            except (ScraperTimeout, BrowserMemoryExceeded) as e:
+                results[scraper_config["name"]] = timed_out_result(scraper_config, e)
+                scraper_statuses[scraper_config["name"]] = "timed_out"
             except Exception as e:
                 error_msg = f"Error in {scraper_config['display_name']} scraper: {str(e)}"
                 print(f"Warning: {error_msg}")
@@ -198,15 +501,19 @@ def process_scraper(task_id, company_id, id_type):
             # Update progress after completing this scraper
             completed_progress = int(
                 independent_progress + ((i + 1) * progress_per_dependent))
-            update_task_status(task_id, TaskStatus.RUNNING.value,
+            # Publish the partial results gathered so far
+            update_task_status(task_id, TaskStatus.RUNNING.value, data=results,
                                progress=completed_progress, scraper_statuses=scraper_statuses)
 
         # Phase 3: Compile all results into human-readable document
+        check_cancelled(task_id)
         update_task_status(task_id, TaskStatus.RUNNING.value, progress=95, scraper_statuses=scraper_statuses)
         try:
             compiled_document = run_async(compile_results(results))
             results["compiled_report"] = compiled_document
             scraper_statuses["compiled_report"] = "completed"
+        except TaskCancelled:
+            raise
         except Exception as e:
             error_msg = f"Error in compilation: {str(e)}"
             print(f"Warning: {error_msg}")
@@ -217,14 +524,29 @@ def process_scraper(task_id, company_id, id_type):
         update_task_status(task_id, TaskStatus.COMPLETED.value,
                            data=results, progress=100, scraper_statuses=scraper_statuses)
 
+    except TaskCancelled:
+        # The cancel endpoint already recorded the status; the scraper was torn down on the loop
+        print(f"Task {task_id} cancelled")
+    except TaskPreempted:
+        # Back in front of its class's queue; the completed scrapers are skipped on resume
+        update_task_status(task_id, TaskStatus.PENDING.value, data=results, scraper_statuses=scraper_statuses)
+        worker_pool.submit(process_scraper, task_id, company_id, id_type, max_age,
+                           priority=worker_pool.current_priority(), front=True)
+        requeued = True
     except Exception as e:
-        # Mark all scrapers as failed
+        # Mark all scrapers as failed, except the completed ones kept for a resubmission
         failed_statuses = {}
         all_scrapers = ["infogreffe", "pappers", "societe", "ellisphere", "google", "compiled_report"]
         for scraper in all_scrapers:
-            failed_statuses[scraper] = "failed"
+            failed_statuses[scraper] = "completed" if scraper_statuses.get(scraper) == "completed" else "failed"
         update_task_status(task_id, TaskStatus.FAILED.value,
                            error=str(e), progress=0, scraper_statuses=failed_statuses)
+    finally:
+        task_cancellation.release(task_id)
+        if not requeued:
+            with running_tasks_lock:
+                running_tasks.discard(task_id)
+            task_store.release(task_id)
 
 
 def get_dependency_input(results, dependency_list):
@@ -287,8 +609,35 @@ async def compile_results(results):
         return f"Erreur lors de la compilation: {str(e)}\nNote: Les données Ellisphere sont exclues de la compilation."
 
 
-async def process_ellisphere(company_id, output_format="json"):
-    """Scrape from Ellisphere (XML-based, reading from local file)"""
+async def process_ellisphere_with_timeout(company_id, timeout):
+    """Run process_ellisphere within `timeout`, keeping the years parsed so far if it runs out"""
+    parsed_years = {}
+    try:
+        return await asyncio.wait_for(process_ellisphere(company_id, parsed_years=parsed_years), timeout=timeout)
+    except asyncio.TimeoutError:
+        partial = format_ellisphere_results(parsed_years) if parsed_years else None
+        raise ScraperTimeout(f"Timed out after {timeout:.0f}s", partial)
+
+
+def format_ellisphere_results(ellisphere_results):
+    """
+    Convert the per-year dictionary to the list format expected by the frontend,
+    each entry having the year and its result
+    """
+    formatted_results = []
+    for year, result in ellisphere_results.items():
+        formatted_results.append({
+            "year": year,
+            "result": result
+        })
+    return formatted_results
+
+
+async def process_ellisphere(company_id, output_format="json", parsed_years=None):
+    """
+    Scrape from Ellisphere (XML-based, reading from local file).
+    Years are added to `parsed_years`, if given, as soon as they are parsed.
+    """
     try:
         # Get periods data from local file
         periods_response = parse_periods_from_file(company_id)
@@ -299,7 +648,7 @@ async def process_ellisphere(company_id, output_format="json"):
         
         periods_data = periods_response['data']
         ellisphere_agent = EllisphereAgent()
-        ellisphere_results = {}
+        ellisphere_results = parsed_years if parsed_years is not None else {}
 
         if not periods_data:
             print("Warning: No Ellisphere periods found in the file")
@@ -366,15 +715,7 @@ async def process_ellisphere(company_id, output_format="json"):
             return {"error": "Failed to parse any period data", "status": "no_data"}
         
         # Convert dictionary to list format for compatibility with existing frontend
-        # Each entry will have year and data
-        formatted_results = []
-        for year, result in ellisphere_results.items():
-            formatted_results.append({
-                "year": year,
-                "result": result
-            })
-        
-        return formatted_results
+        return format_ellisphere_results(ellisphere_results)
     except Exception as e:
         error_msg = f"Ellisphere processing error: {str(e)}"
         print(f"Warning: {error_msg}")
@@ -409,25 +750,69 @@ async def get_companies(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Endpoints writing to the task store are plain functions, run in FastAPI's
+# threadpool, so a write waiting on a locked shared database never blocks the event loop
 @app.post("/scrape-company")
-async def scrape_company(request: Request):
+def scrape_company(request: Request):
     """
     Scrape the company information from the website.
+    Passing the `task_id` of a failed, cancelled or interrupted task runs it
+    again, skipping the scrapers it already completed.
     """
     params = request.query_params
     company_id = params.get("company_id")
     id_type = params.get("id_type")
 
-    task_id = str(uuid.uuid4())
-    with task_lock:
-        task_results[task_id] = {'status': TaskStatus.PENDING.value}
+    # Sources cached less than `max_age` seconds ago are not scraped again (0 re-scrapes everything)
+    max_age = None
+    if params.get("max_age"):
+        try:
+            max_age = float(params.get("max_age"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="max_age must be a number of seconds")
 
-    thread = threading.Thread(
-        target=process_scraper,
-        args=(task_id, company_id, id_type),
-        daemon=True
-    )
-    thread.start()
+    # "interactive" (default) or "bulk" for background jobs that may wait and be preempted
+    priority = params.get("priority", "interactive")
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITY_CLASSES)}")
+
+    task_id = params.get("task_id")
+    snapshot = task_store.get_snapshot(task_id) if task_id else None
+    if snapshot is not None:
+        if snapshot.status == TaskStatus.COMPLETED.value:
+            return {
+                "success": True,
+                "data": {"task_id": task_id, "status": snapshot.status},
+                "message": "Task already completed"
+            }
+        if snapshot.status not in FINISHED_STATUSES:
+            # Running here or on its owner; orphaned tasks are taken over automatically
+            return {
+                "success": True,
+                "data": {"task_id": task_id, "status": snapshot.status},
+                "message": "Task already running"
+            }
+        if not start_task(task_id, snapshot.company_id, snapshot.id_type, max_age, priority, reopen=True):
+            # Its cancelled pipeline has not exited yet (it checks about once a second)
+            raise HTTPException(status_code=409, detail="Task is still stopping, try again in a few seconds")
+        return {
+            "success": True,
+            "data": {"task_id": task_id, "status": TaskStatus.PENDING.value},
+            "message": "Scraping task resumed"
+        }
+
+    # Requests for the same company and sources attach to the scrape already running
+    task_id, created = submit_scrape(company_id, id_type, max_age, priority)
+    if not created:
+        return {
+            "success": True,
+            "data": {
+                "task_id": task_id,
+                "status": task_store.get_snapshot(task_id).status,
+                "attached": True
+            },
+            "message": "Attached to the scraping task already running for this company"
+        }
 
     return {
         "success": True,
@@ -439,22 +824,313 @@ async def scrape_company(request: Request):
     }
 
 
-@app.get("/get-task-status/{task_id}")
-async def get_task_status(task_id: str):
+@app.post("/scrape-batch")
+async def scrape_batch(request: Request):
     """
-    Get the status of a task
+    Scrape a list of companies. The JSON body is {"companies": [...], "id_type": "SIREN", "max_age": ...}
+    where each company is an identifier or a {"company_id", "id_type"} object.
+    Duplicates are scraped once, companies already being scraped are attached
+    to, and every task is queued on the shared worker pool as bulk work, which
+    interactive scrapes overtake (fresh sources come from the source cache).
     """
-    with task_lock:
-        result = task_results.get(task_id)
-        if result is None:
-            raise HTTPException(status_code=404, detail="Task not found")
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected a JSON body")
+    companies = body.get("companies") if isinstance(body, dict) else None
+    if not isinstance(companies, list) or not companies:
+        raise HTTPException(status_code=400, detail="companies must be a non-empty list")
+    if len(companies) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {BATCH_MAX_SIZE} companies")
+    default_id_type = body.get("id_type", "SIREN")
+    max_age = body.get("max_age")
+    if max_age is not None:
+        try:
+            max_age = float(max_age)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="max_age must be a number of seconds")
+
+    batch_id, items = await asyncio.to_thread(submit_batch, companies, default_id_type, max_age)
+
+    return {
+        "success": True,
+        "data": {
+            "batch_id": batch_id,
+            "tasks": len(items),
+            "items": items
+        },
+        "message": "Batch scraping started successfully"
+    }
+
 
+def submit_batch(companies, default_id_type, max_age):
+    """Submit the companies of a batch as bulk scrapes and record the batch. Returns (batch_id, items)."""
+    items = []
+    seen = set()
+    for company in companies:
+        if isinstance(company, dict):
+            company_id, id_type = company.get("company_id"), company.get("id_type", default_id_type)
+        else:
+            company_id, id_type = company, default_id_type
+        if not company_id:
+            raise HTTPException(status_code=400, detail="Every company needs a company_id")
+        key = scrape_key(company_id, id_type, PIPELINE_SOURCES)
+        if key in seen:
+            continue
+        seen.add(key)
+        task_id, created = submit_scrape(str(company_id), id_type, max_age, priority="bulk")
+        items.append({"company_id": str(company_id), "id_type": id_type, "task_id": task_id, "attached": not created})
+
+    batch_id = str(uuid.uuid4())
+    task_store.create_batch(batch_id, items)
+    return batch_id, items
+
+
+def batch_status(items, snapshots=None):
+    """Aggregate status and progress of a batch's tasks, from their current `snapshots` if given"""
+    if snapshots is None:
+        snapshots = task_store.get_snapshots({item["task_id"] for item in items})
+    counts = {}
+    total_progress = 0
+    companies = []
+    for item in items:
+        snapshot = snapshots.get(item["task_id"])
+        status = snapshot.status if snapshot is not None else "expired"
+        if status in FINISHED_STATUSES or snapshot is None:
+            progress = 100
+        else:
+            progress = snapshot.progress or 0
+        counts[status] = counts.get(status, 0) + 1
+        total_progress += progress
+        companies.append(dict(item, status=status, progress=progress))
+
+    finished = sum(count for status, count in counts.items() if status in FINISHED_STATUSES or status == "expired")
+    return {
+        "status": "completed" if finished == len(items) else "running",
+        "progress": total_progress / len(items) if items else 100,
+        "counts": counts,
+        "companies": companies
+    }
+
+
+@app.get("/get-batch-status/{batch_id}")
+def get_batch_status(batch_id: str):
+    """
+    Get the aggregate progress of a batch and the status of each of its companies
+    """
+    items = task_store.get_batch(batch_id)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return {
+        "success": True,
+        "data": dict(batch_status(items), batch_id=batch_id),
+        "message": "Batch status retrieved successfully"
+    }
+
+
+@app.get("/batch-events/{batch_id}")
+async def batch_events(batch_id: str):
+    """
+    Stream a batch as Server-Sent Events: a "result" event with each company's
+    task record as soon as it finishes, a "progress" event with the aggregate
+    progress whenever a task changes, and "done" once every task finished
+    """
+    items = await asyncio.to_thread(task_store.get_batch, batch_id)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    async def event_stream():
+        # Snapshots of the batch's tasks, refreshed only for the tasks that changed
+        snapshots = await asyncio.to_thread(task_store.get_snapshots, {item["task_id"] for item in items})
+        reported = set()
+        last_progress = None
+        while True:
+            for item in items:
+                task_id = item["task_id"]
+                snapshot = snapshots[task_id]
+                if task_id in reported or (snapshot is not None and snapshot.status not in FINISHED_STATUSES):
+                    continue
+                reported.add(task_id)
+                result = dict(item, result=await asyncio.to_thread(task_store.get, task_id))
+                yield f"event: result\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+
+            status = batch_status(items, snapshots)
+            progress = json.dumps({key: status[key] for key in ("status", "progress", "counts")})
+            if progress != last_progress:
+                yield f"event: progress\ndata: {progress}\n\n"
+                last_progress = progress
+            else:
+                yield ": keep-alive\n\n"
+            if len(reported) == len(snapshots):
+                yield "event: done\ndata: {}\n\n"
+                return
+
+            # One wait for the whole batch, woken as soon as any unfinished task changes
+            versions = {
+                task_id: snapshot.version for task_id, snapshot in snapshots.items() if task_id not in reported
+            }
+            snapshots.update(await task_store.wait_for_changes(versions, TASK_EVENTS_KEEPALIVE))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/cancel-task/{task_id}")
+def cancel_task(task_id: str):
+    """
+    Cancel a pending or running task: its running scraper is cancelled (closing
+    its browser session and Chromium processes), in-flight LLM calls are
+    aborted and the worker thread is released
+    """
+    snapshot = task_store.get_snapshot(task_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if snapshot.status in FINISHED_STATUSES:
         return {
-            "success": True,
-            "data": result,
-            "message": "Task status retrieved successfully"
+            "success": False,
+            "data": {"task_id": task_id, "status": snapshot.status},
+            "message": f"Task already {snapshot.status}"
         }
 
+    scraper_statuses = {
+        name: "cancelled" if status == "running" else status
+        for name, status in (snapshot.scraper_statuses or {}).items()
+    }
+    update_task_status(task_id, TaskStatus.CANCELLED.value, scraper_statuses=scraper_statuses)
+    # Tasks running on another worker notice the status on their next check
+    task_cancellation.cancel(task_id)
+
+    return {
+        "success": True,
+        "data": {"task_id": task_id, "status": TaskStatus.CANCELLED.value},
+        "message": "Task cancelled"
+    }
+
+
+@app.get("/get-task-status/{task_id}")
+async def get_task_status(task_id: str, request: Request, response: Response,
+                          since_version: int = None, fields: str = None, wait: float = None):
+    """
+    Get the status of a task.
+    `since_version` only returns what changed after that version, `fields`
+    (comma separated, e.g. "progress,scraper_statuses") only the listed fields.
+    The ETag is the task version, so If-None-Match gets a 304 while nothing changed.
+    With `wait` (seconds), the request is held until the task moves past
+    `since_version` (or the If-None-Match version) or the wait expires.
+    """
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in TASK_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    # Reads of a shared task database can wait on its lock, so they run off the event loop
+    snapshot = await asyncio.to_thread(task_store.get_snapshot, task_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if_none_match = request.headers.get("if-none-match")
+    known_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] if if_none_match else []
+
+    if wait and wait > 0:
+        known_version = since_version
+        if known_version is None and len(known_tags) == 1 and known_tags[0].strip('"').isdigit():
+            known_version = int(known_tags[0].strip('"'))
+        if known_version is not None and snapshot.version == known_version:
+            # Waits on the event loop, no thread is held while the task is idle
+            snapshot = await task_store.wait_for_change(task_id, known_version, min(wait, TASK_STATUS_MAX_WAIT))
+            if snapshot is None:
+                raise HTTPException(status_code=404, detail="Task not found")
+
+    etag = f'"{snapshot.version}"'
+    if etag in known_tags:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await asyncio.to_thread(task_store.get, task_id, fields=selected, since_version=since_version)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    response.headers["ETag"] = f'"{result["version"]}"'
+    return {
+        "success": True,
+        "data": result,
+        "message": "Task status retrieved successfully"
+    }
+
+
+@app.get("/task-events/{task_id}")
+async def task_events(task_id: str, request: Request):
+    """
+    Stream task updates as Server-Sent Events: one "status" event with the full
+    task record (status, progress, scraper statuses and partial results) each
+    time the task changes, until it finishes
+    """
+    if await asyncio.to_thread(task_store.get_snapshot, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # Resume after the last version the client received
+    last_event_id = request.headers.get("last-event-id")
+    version = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+
+    async def event_stream():
+        nonlocal version
+        while True:
+            snapshot = await task_store.wait_for_change(task_id, version, TASK_EVENTS_KEEPALIVE)
+            if snapshot is None:
+                yield "event: error\ndata: {\"detail\": \"Task not found\"}\n\n"
+                return
+            if snapshot.version == version:
+                yield ": keep-alive\n\n"
+                continue
+
+            record = await asyncio.to_thread(task_store.get, task_id)
+            version = record["version"]
+            yield f"id: {version}\nevent: status\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
+            if record["status"] in FINISHED_STATUSES:
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Get the per-tier LLM latency and token metrics, the rate limiter state and task store usage
+    """
+    return {
+        "success": True,
+        "data": {
+            "models": model_metrics.snapshot(),
+            "llm_rate_limit": llm_rate_limiter.snapshot(),
+            "cancellation": task_cancellation.snapshot(),
+            "source_cache": source_cache.stats(),
+            "workers": worker_pool.snapshot(),
+            "domains": domain_limiter.snapshot(),
+            "circuits": source_breaker.snapshot(),
+            "hedging": scraper_hedger.snapshot(),
+            "concurrency": concurrency_controller.snapshot(),
+            "browser_memory": browser_memory.snapshot(),
+            "browsers": browser_lifecycle.snapshot(),
+            "browser_profiles": browser_profiles.snapshot(),
+            "tasks": dict(task_store.stats(), watchers=task_store.watchers.count())
+        },
+        "message": "Metrics retrieved successfully"
+    }
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    if API_WORKERS > 1 and task_store.name == "memory":
+        raise SystemExit("API_WORKERS > 1 requires a shared task backend, set TASK_STATE_BACKEND=sqlite")
+    if API_WORKERS > 1:
+        uvicorn.run("app:app", host="127.0.0.1", port=8000, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000)
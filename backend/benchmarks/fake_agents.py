@@ -0,0 +1,73 @@
+"""Browser-free stand-ins for ScrapingAgent used by the benchmarks."""
+
+from browser_use.llm.messages import UserMessage
+from config.model import RoutedChatModel
+from helpers.adaptive_concurrency import concurrency_controller
+from helpers.site_limiter import domain_limiter
+from scraper_agents import ScraperTimeout, BrowserCapacityTimeout
+import asyncio
+import time
+
+
+class FakeScrapingAgent:
+    """
+    Replaces ScrapingAgent without launching Chromium: each step waits for a
+    simulated page load, then makes one real LLM call through the routed model
+    (so the LLM and domain limiters and the shared client are exercised).
+    """
+
+    page_latency = 0.5
+    steps = 3
+
+    def __init__(self, task, workload="browser_navigation", timeout=None, max_steps=None, source=None):
+        self.task = task
+        self.workload = workload
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.source = source
+        self.completed_steps = 0
+
+    async def _run(self, company_id, id_type):
+        llm = RoutedChatModel(self.workload)
+        for step in range(self.steps):
+            if self.max_steps and step >= self.max_steps:
+                raise ScraperTimeout(f"Stopped after {self.max_steps} steps", self._partial(company_id))
+            await domain_limiter.navigate(self.source)
+            await asyncio.sleep(self.page_latency)
+            await llm.ainvoke([UserMessage(content=f"Step {step + 1}: {self.task[:200]}")])
+            self.completed_steps += 1
+            domain_limiter.observe_step(self.source)
+
+        return f"**Résultat simulé** pour {company_id} ({id_type}): {self.task[:80].strip()}"
+
+    def _partial(self, company_id):
+        if not self.completed_steps:
+            return None
+        return f"**Résultat partiel simulé** pour {company_id}: {self.completed_steps} étapes"
+
+    async def scrape(self, company_id, id_type):
+        started = time.monotonic()
+        if not await domain_limiter.acquire_session(self.source, self.timeout):
+            raise BrowserCapacityTimeout(f"No browser session free within {self.timeout:.0f}s")
+        browser_started = time.monotonic()
+        try:
+            timeout = self.timeout - (browser_started - started) if self.timeout else None
+            result = await asyncio.wait_for(self._run(company_id, id_type), timeout=timeout)
+            concurrency_controller.record(self.source, time.monotonic() - browser_started, ok=True)
+            return result
+        except asyncio.TimeoutError:
+            partial = self._partial(company_id)
+            concurrency_controller.record(self.source, time.monotonic() - browser_started, ok=partial is not None)
+            raise ScraperTimeout(f"Timed out after {self.timeout:.0f}s", partial)
+        except Exception:
+            concurrency_controller.record(self.source, time.monotonic() - browser_started, ok=False)
+            raise
+        finally:
+            domain_limiter.release_session(self.source)
+
+
+def configure_fake_agents(page_latency=None, steps=None):
+    if page_latency is not None:
+        FakeScrapingAgent.page_latency = page_latency
+    if steps is not None:
+        FakeScrapingAgent.steps = steps
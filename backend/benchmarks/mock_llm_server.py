@@ -0,0 +1,211 @@
+"""
+Local OpenAI-compatible mock server for offline benchmarks.
+Serves /v1/chat/completions (browser-use) and /v1/responses (openai-agents)
+with configurable latency and canned outputs.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+CANNED_FINANCIAL_REPORT = {
+    "company_financial_report": {
+        "report_year": "2023",
+        "privacy": "PUBLIC",
+        "category": "benchmark",
+        "currency": "EUR",
+        "periods": []
+    }
+}
+
+# Canned outputs, picked by the first marker found in the request text
+DEFAULT_OUTPUTS = [
+    ("company_financial_report", json.dumps(CANNED_FINANCIAL_REPORT)),
+    ("Translator and Compiler Agent", "**PROFIL DE L'ENTREPRISE**\nRapport de benchmark."),
+    ("PROFIL DE L'ENTREPRISE", "**PROFIL DE L'ENTREPRISE**\nRapport de benchmark."),
+]
+DEFAULT_OUTPUT = "Résultat de benchmark."
+
+
+class MockLLMServer:
+    """OpenAI-compatible HTTP server running in a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.0, outputs=None, default_output=DEFAULT_OUTPUT,
+                 headers=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.outputs = outputs if outputs is not None else DEFAULT_OUTPUTS
+        self.default_output = default_output
+        # Extra headers sent with every successful response (e.g. x-ratelimit-*)
+        self.headers = dict(headers or {})
+        self.request_count = 0
+        self._rate_limited = 0
+        self._rate_limit_headers = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def rate_limit(self, count, headers=None):
+        """Answer the next `count` requests with a 429 carrying `headers` (e.g. Retry-After)"""
+        with self._lock:
+            self._rate_limited = count
+            self._rate_limit_headers = dict(headers or {})
+
+    def output_for(self, request_text):
+        for marker, output in self.outputs:
+            if marker in request_text:
+                return output
+        return self.default_output
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                    rate_limited = server._rate_limited > 0
+                    if rate_limited:
+                        server._rate_limited -= 1
+                    rate_limit_headers = dict(server._rate_limit_headers)
+                if rate_limited:
+                    data = json.dumps({"error": {"message": "Rate limit reached", "type": "requests",
+                                                 "code": "rate_limit_exceeded"}}).encode("utf-8")
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    for name, value in rate_limit_headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                time.sleep(max(server.latency + random.uniform(-server.jitter, server.jitter), 0))
+
+                request_text = json.dumps(body, ensure_ascii=False)
+                output = server.output_for(request_text)
+                if self.path.endswith("/chat/completions"):
+                    payload = chat_completion_payload(body, output, request_text)
+                elif self.path.endswith("/responses"):
+                    payload = response_payload(body, output, request_text)
+                else:
+                    self.send_error(404)
+                    return
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in server.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _token_count(text):
+    return max(len(text) // 4, 1)
+
+
+def chat_completion_payload(body, output, request_text):
+    prompt_tokens = _token_count(request_text)
+    completion_tokens = _token_count(output)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": output},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def response_payload(body, output, request_text):
+    input_tokens = _token_count(request_text)
+    output_tokens = _token_count(output)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "mock"),
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": output, "annotations": []}]
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around the latency")
+    parser.add_argument("--outputs", help="JSON file with a list of [marker, output] pairs")
+    args = parser.parse_args()
+
+    outputs = None
+    if args.outputs:
+        with open(args.outputs, "r", encoding="utf-8") as file:
+            outputs = [tuple(pair) for pair in json.load(file)]
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.jitter, outputs)
+    print(f"Mock LLM server listening on {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Replay a recorded task from a cassette, fully offline, for profiling and
+performance regression runs.
+
+Record a real run first by starting the API with CASSETTE_MODE=record (and
+optionally CASSETTE_PATH), then replay it from the backend folder:
+    python -m benchmarks.replay_task --cassette cassettes/cassette.jsonl.gz \\
+        --company-id 552134736 --id-type SIREN --timing zero --profile replay.prof
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(cassette_path, timing):
+    """Import the backend app in cassette replay mode"""
+    os.environ["CASSETTE_MODE"] = "replay"
+    os.environ["CASSETTE_PATH"] = cassette_path
+    os.environ["CASSETTE_TIMING"] = timing
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    # Task state and the source cache live in a scratch directory, so a replay
+    # neither reads nor fills the real cache
+    data_dir = tempfile.mkdtemp(prefix="intersud-bench-")
+    os.environ["TASK_DB_PATH"] = os.path.join(data_dir, "tasks.db")
+    os.environ["TASK_SHARED_DB_PATH"] = os.path.join(data_dir, "tasks-shared.db")
+    os.environ["SOURCE_CACHE_PATH"] = os.path.join(data_dir, "source-cache.db")
+    os.environ["ANONYMIZED_TELEMETRY"] = "false"
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    import app as backend_app
+    backend_app.init_llm_clients()
+    return backend_app
+
+
+def replay(backend_app, target, company_id, id_type):
+    if target == "process_ellisphere":
+        result = backend_app.run_async(backend_app.process_ellisphere(company_id))
+        return {"result": result}
+
+    task_id = str(uuid.uuid4())
+    backend_app.task_store.create(task_id, "pending", company_id, id_type)
+    # max_age=0 runs every recorded scrape instead of serving it from the cache
+    backend_app.process_scraper(task_id, company_id, id_type, max_age=0)
+    return backend_app.task_store.get(task_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded task from a cassette")
+    parser.add_argument("--cassette", required=True, help="Path to the .jsonl.gz cassette")
+    parser.add_argument("--company-id", required=True)
+    parser.add_argument("--id-type", default="SIREN")
+    parser.add_argument("--timing", choices=["original", "zero"], default="zero",
+                        help="Replay with the recorded durations or without waiting")
+    parser.add_argument("--target", choices=["process_scraper", "process_ellisphere"], default="process_scraper")
+    parser.add_argument("--profile", help="Write cProfile stats to this file")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    cassette_path = os.path.abspath(args.cassette)
+    os.chdir(BACKEND_DIR)
+    backend_app = load_app(cassette_path, args.timing)
+
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.monotonic()
+    if profiler:
+        profiler.enable()
+    outcome = replay(backend_app, args.target, args.company_id, args.id_type)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    duration = time.monotonic() - started
+
+    report = {
+        "target": args.target,
+        "timing": args.timing,
+        "duration_seconds": duration,
+        "status": outcome.get("status"),
+        "scraper_statuses": outcome.get("scraper_statuses"),
+        "error": outcome.get("error"),
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+End-to-end orchestration benchmark, fully offline.
+
+Runs N concurrent /scrape-company tasks against the real FastAPI app with the
+LLM provider replaced by the local mock server and ScrapingAgent replaced by
+FakeScrapingAgent, then writes a JSON report with throughput, p50/p95 task
+latency, status polling cost and memory growth.
+
+Usage (from the backend folder):
+    python -m benchmarks.run_benchmark --tasks 20 --output bench_report.json
+"""
+
+from .mock_llm_server import MockLLMServer
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "max": None, "mean": None}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+    }
+
+
+def benchmark_company_id(company_id, index):
+    """A distinct SIREN per task, so tasks are neither coalesced nor served from the source cache"""
+    return f"{(int(company_id) + index) % 10 ** 9:09d}"
+
+
+def load_app(mock_server, page_latency, steps, requests_per_minute=None, tokens_per_minute=None):
+    """Import the backend app wired to the mock LLM and the fake browser agents"""
+    os.environ["OPENAI_BASE_URL"] = mock_server.base_url
+    if requests_per_minute is not None:
+        os.environ["LLM_REQUESTS_PER_MINUTE"] = str(requests_per_minute)
+    if tokens_per_minute is not None:
+        os.environ["LLM_TOKENS_PER_MINUTE"] = str(tokens_per_minute)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    data_dir = tempfile.mkdtemp(prefix="intersud-bench-")
+    os.environ["TASK_DB_PATH"] = os.path.join(data_dir, "tasks.db")
+    os.environ["SOURCE_CACHE_PATH"] = os.path.join(data_dir, "source-cache.db")
+    os.environ["ANONYMIZED_TELEMETRY"] = "false"
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    import app as backend_app
+    from .fake_agents import FakeScrapingAgent, configure_fake_agents
+
+    configure_fake_agents(page_latency=page_latency, steps=steps)
+    backend_app.ScrapingAgent = FakeScrapingAgent
+    return backend_app
+
+
+def run_benchmark(tasks=10, poll_interval=0.5, llm_latency=0.2, llm_jitter=0.05,
+                  page_latency=0.5, steps=3, company_id="123456789", id_type="SIREN",
+                  timeout=600, requests_per_minute=None, tokens_per_minute=None, poll_fields=None):
+    from fastapi.testclient import TestClient
+
+    mock_server = MockLLMServer(latency=llm_latency, jitter=llm_jitter).start()
+    backend_app = load_app(mock_server, page_latency, steps, requests_per_minute, tokens_per_minute)
+
+    tracemalloc.start()
+    memory_start = tracemalloc.get_traced_memory()[0]
+    started = time.monotonic()
+
+    submit_latencies = []
+    poll_latencies = []
+    poll_bytes = []
+    task_latencies = []
+    submitted_at = {}
+    outcomes = {}
+
+    with TestClient(backend_app.app) as client:
+        for index in range(tasks):
+            request_started = time.monotonic()
+            response = client.post("/scrape-company", params={
+                "company_id": benchmark_company_id(company_id, index), "id_type": id_type})
+            submit_latencies.append(time.monotonic() - request_started)
+            task_id = response.json()["data"]["task_id"]
+            submitted_at[task_id] = request_started
+
+        pending = set(submitted_at)
+        etags = {}
+        while pending and time.monotonic() - started < timeout:
+            for task_id in list(pending):
+                request_started = time.monotonic()
+                params = {"fields": poll_fields} if poll_fields else None
+                headers = {"If-None-Match": etags[task_id]} if poll_fields and task_id in etags else None
+                response = client.get(f"/get-task-status/{task_id}", params=params, headers=headers)
+                poll_latencies.append(time.monotonic() - request_started)
+                poll_bytes.append(len(response.content))
+                if response.status_code == 304:
+                    continue
+                etags[task_id] = response.headers.get("ETag")
+
+                status = response.json()["data"].get("status")
+                if status in ("completed", "failed", "cancelled"):
+                    task_latencies.append(time.monotonic() - submitted_at[task_id])
+                    outcomes[status] = outcomes.get(status, 0) + 1
+                    pending.discard(task_id)
+            if pending:
+                time.sleep(poll_interval)
+
+        metrics = client.get("/metrics").json()["data"]
+
+    duration = time.monotonic() - started
+    memory_end, memory_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mock_server.stop()
+
+    return {
+        "config": {
+            "tasks": tasks,
+            "poll_interval": poll_interval,
+            "poll_fields": poll_fields,
+            "llm_latency": llm_latency,
+            "llm_jitter": llm_jitter,
+            "page_latency": page_latency,
+            "steps": steps,
+            "requests_per_minute": requests_per_minute,
+            "tokens_per_minute": tokens_per_minute,
+        },
+        "tasks": {
+            "submitted": tasks,
+            "timed_out": len(pending),
+            "outcomes": outcomes,
+        },
+        "duration_seconds": duration,
+        "throughput_tasks_per_second": sum(outcomes.values()) / duration if duration else None,
+        "task_latency_seconds": summarize(task_latencies),
+        "submit_latency_seconds": summarize(submit_latencies),
+        "polling": {
+            "latency_seconds": summarize(poll_latencies),
+            "bytes_total": sum(poll_bytes),
+            "bytes_per_request_mean": sum(poll_bytes) / len(poll_bytes) if poll_bytes else 0,
+        },
+        "memory": {
+            "traced_start_bytes": memory_start,
+            "traced_end_bytes": memory_end,
+            "traced_peak_bytes": memory_peak,
+            "traced_growth_bytes": memory_end - memory_start,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "llm": {
+            "mock_requests": mock_server.request_count,
+            "metrics": metrics,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of process_scraper")
+    parser.add_argument("--tasks", type=int, default=10, help="Number of concurrent /scrape-company tasks")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between status polling rounds")
+    parser.add_argument("--poll-fields", help="Poll only these fields (e.g. status,progress) with ETag revalidation")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mock LLM response latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="Mock LLM latency jitter in seconds")
+    parser.add_argument("--page-latency", type=float, default=0.5, help="Simulated page load per fake browser step")
+    parser.add_argument("--steps", type=int, default=3, help="Fake browser steps (one LLM call each) per scraper")
+    parser.add_argument("--requests-per-minute", type=int, help="Override LLM_REQUESTS_PER_MINUTE for the run")
+    parser.add_argument("--tokens-per-minute", type=int, help="Override LLM_TOKENS_PER_MINUTE for the run")
+    parser.add_argument("--timeout", type=float, default=600, help="Give up on unfinished tasks after this many seconds")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    report = run_benchmark(
+        tasks=args.tasks,
+        poll_interval=args.poll_interval,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        page_latency=args.page_latency,
+        steps=args.steps,
+        timeout=args.timeout,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        poll_fields=args.poll_fields,
+    )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
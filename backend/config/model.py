@@ -1,6 +1,229 @@
 from browser_use.llm import ChatOpenAI
+from agents import Runner
 from dotenv import load_dotenv
+from helpers.llm_limiter import llm_rate_limiter, estimate_tokens, rate_limit_headers
+from helpers.llm_client import get_http_client
+import asyncio
+import os
+import threading
+import time
 
 load_dotenv()
 
-llm = ChatOpenAI(model="gpt-4o")
+# Model tiers. Each tier has a model, a per-call timeout (seconds) and the tier
+# to fall back to when a call times out or errors.
+MODEL_TIERS = {
+    "fast": {
+        "model": os.getenv("MODEL_TIER_FAST", "gpt-4o-mini"),
+        "timeout": float(os.getenv("MODEL_TIER_FAST_TIMEOUT", "90")),
+        "fallback": "standard",
+    },
+    "standard": {
+        "model": os.getenv("MODEL_TIER_STANDARD", "gpt-4o"),
+        "timeout": float(os.getenv("MODEL_TIER_STANDARD_TIMEOUT", "300")),
+        "fallback": None,
+    },
+}
+
+# Calls rejected with a 429 wait out the rate limiter's pause and are retried
+# on the same tier this many times: a bigger model only costs more under throttling
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+
+# Which tier handles each workload
+WORKLOAD_TIERS = {
+    "browser_navigation": os.getenv("WORKLOAD_TIER_BROWSER_NAVIGATION", "fast"),
+    "google_extraction": os.getenv("WORKLOAD_TIER_GOOGLE_EXTRACTION", "fast"),
+    "xml_parsing": os.getenv("WORKLOAD_TIER_XML_PARSING", "fast"),
+    "compilation": os.getenv("WORKLOAD_TIER_COMPILATION", "standard"),
+}
+
+
+def tier_for(workload):
+    """Return the tier configured for a workload"""
+    tier = WORKLOAD_TIERS.get(workload, "standard")
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier '{tier}' for workload '{workload}'")
+    return tier
+
+
+def model_for(workload):
+    """Return the model name configured for a workload"""
+    return MODEL_TIERS[tier_for(workload)]["model"]
+
+
+def tier_chain(tier):
+    """Return the tier followed by its fallbacks, in order"""
+    chain = []
+    while tier is not None and tier not in chain:
+        chain.append(tier)
+        tier = MODEL_TIERS[tier]["fallback"]
+    return chain
+
+
+class ModelMetrics:
+    """Per-tier latency and token counters, shared by every thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}
+
+    def _entry(self, tier):
+        return self._tiers.setdefault(tier, {
+            "calls": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "fallbacks": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        })
+
+    def record_success(self, tier, latency, input_tokens=0, output_tokens=0):
+        with self._lock:
+            entry = self._entry(tier)
+            entry["calls"] += 1
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            entry["input_tokens"] += input_tokens or 0
+            entry["output_tokens"] += output_tokens or 0
+
+    def record_failure(self, tier, latency, timed_out=False):
+        with self._lock:
+            entry = self._entry(tier)
+            entry["calls"] += 1
+            entry["failures"] += 1
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            if timed_out:
+                entry["timeouts"] += 1
+
+    def record_fallback(self, tier):
+        with self._lock:
+            self._entry(tier)["fallbacks"] += 1
+
+    def snapshot(self):
+        """Return a copy of the counters with the average latency per tier"""
+        with self._lock:
+            snapshot = {}
+            for tier, entry in self._tiers.items():
+                snapshot[tier] = dict(entry)
+                snapshot[tier]["model"] = MODEL_TIERS.get(tier, {}).get("model")
+                snapshot[tier]["avg_latency"] = entry["total_latency"] / entry["calls"] if entry["calls"] else 0.0
+            return snapshot
+
+
+model_metrics = ModelMetrics()
+
+
+def _browser_llm(tier):
+    return ChatOpenAI(model=MODEL_TIERS[tier]["model"], http_client=get_http_client())
+
+
+class RoutedChatModel:
+    """
+    browser-use chat model that sends each call to the tier of its workload,
+    falling back to the next tier on timeout or error. Rate limited calls are
+    retried on the same tier.
+    """
+
+    _verified_api_keys = False
+
+    def __init__(self, workload):
+        self.workload = workload
+        self.tier = tier_for(workload)
+        self.model = MODEL_TIERS[self.tier]["model"]
+
+    @property
+    def provider(self):
+        return "openai"
+
+    @property
+    def name(self):
+        return self.model
+
+    @property
+    def model_name(self):
+        return self.model
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        last_error = None
+        for tier in tier_chain(self.tier):
+            if last_error is not None:
+                model_metrics.record_fallback(tier)
+            for _ in range(LLM_RATE_LIMIT_RETRIES + 1):
+                reservation = await llm_rate_limiter.acquire(estimate_tokens(messages))
+                started = time.monotonic()
+                try:
+                    response = await asyncio.wait_for(
+                        _browser_llm(tier).ainvoke(messages, output_format, **kwargs),
+                        timeout=MODEL_TIERS[tier]["timeout"])
+                except Exception as e:
+                    headers = rate_limit_headers(e)
+                    model_metrics.record_failure(
+                        tier, time.monotonic() - started, timed_out=isinstance(e, asyncio.TimeoutError))
+                    print(f"Warning: {self.workload} call on tier '{tier}' failed: {e!r}")
+                    last_error = e
+                    if headers is None:
+                        break
+                    # Throttled: wait for the limiter's pause and try the same tier again
+                    llm_rate_limiter.on_rate_limited(headers)
+                    continue
+
+                usage = response.usage
+                if usage:
+                    reservation.release(usage.total_tokens)
+                model_metrics.record_success(
+                    tier, time.monotonic() - started,
+                    usage.prompt_tokens if usage else 0,
+                    usage.completion_tokens if usage else 0)
+                return response
+            else:
+                # Still rate limited: never escalate to a more expensive tier for it
+                raise last_error
+
+        raise last_error
+
+
+async def run_agent(agent, agent_input, workload):
+    """
+    Run an openai-agents Agent on the tier of its workload, falling back to the
+    next tier on timeout or error. Rate limited calls are retried on the same tier.
+    """
+    last_error = None
+    for tier in tier_chain(tier_for(workload)):
+        if last_error is not None:
+            model_metrics.record_fallback(tier)
+        for _ in range(LLM_RATE_LIMIT_RETRIES + 1):
+            reservation = await llm_rate_limiter.acquire(estimate_tokens(f"{agent.instructions}{agent_input}"))
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    Runner.run(agent.clone(model=MODEL_TIERS[tier]["model"]), agent_input),
+                    timeout=MODEL_TIERS[tier]["timeout"])
+            except Exception as e:
+                headers = rate_limit_headers(e)
+                model_metrics.record_failure(
+                    tier, time.monotonic() - started, timed_out=isinstance(e, asyncio.TimeoutError))
+                print(f"Warning: {workload} call on tier '{tier}' failed: {e!r}")
+                last_error = e
+                if headers is None:
+                    break
+                # Throttled: wait for the limiter's pause and try the same tier again
+                llm_rate_limiter.on_rate_limited(headers)
+                continue
+
+            input_tokens = sum(response.usage.input_tokens for response in result.raw_responses)
+            output_tokens = sum(response.usage.output_tokens for response in result.raw_responses)
+            reservation.release(input_tokens + output_tokens)
+            model_metrics.record_success(tier, time.monotonic() - started, input_tokens, output_tokens)
+            return result
+        else:
+            # Still rate limited: never escalate to a more expensive tier for it
+            raise last_error
+
+    raise last_error
+
+
+# Default model for browser agents
+llm = RoutedChatModel("browser_navigation")
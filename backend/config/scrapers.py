@@ -0,0 +1,72 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+
+def _limits(source, timeout, max_steps, retries, retry_backoff):
+    name = source.upper()
+    return {
+        "timeout": float(os.getenv(f"SCRAPER_TIMEOUT_{name}", timeout)),
+        "max_steps": int(os.getenv(f"SCRAPER_MAX_STEPS_{name}", max_steps)),
+        "retries": int(os.getenv(f"SCRAPER_RETRIES_{name}", retries)),
+        "retry_backoff": float(os.getenv(f"SCRAPER_RETRY_BACKOFF_{name}", retry_backoff)),
+    }
+
+
+# Time budget (seconds) and browser agent step budget of each source. A
+# scraper that runs out of either is marked timed_out and keeps its partial output.
+# Attempts failing with a transient error are retried up to `retries` times, waiting `retry_backoff`
+# seconds before the first retry and doubling after each one.
+SCRAPER_LIMITS = {
+    "infogreffe": _limits("infogreffe", "300", "40", "2", "5"),
+    "pappers": _limits("pappers", "300", "40", "2", "5"),
+    "societe": _limits("societe", "300", "40", "2", "5"),
+    "ellisphere": _limits("ellisphere", "600", "0", "1", "10"),
+    "google": _limits("google", "300", "30", "2", "5"),
+}
+
+# Budget of a whole task's scrapers; compilation runs on whatever they gathered
+TASK_DEADLINE_SECONDS = float(os.getenv("TASK_DEADLINE_SECONDS", "1800"))
+
+
+def limits_for(source):
+    """Return the timeout, max steps and retry policy of a source"""
+    return SCRAPER_LIMITS.get(source, {"timeout": 300.0, "max_steps": 40, "retries": 0, "retry_backoff": 5.0})
+
+
+def _domain(source, domain, max_sessions, navigations_per_minute):
+    name = source.upper()
+    return {
+        "domain": os.getenv(f"DOMAIN_{name}", domain),
+        "max_sessions": int(os.getenv(f"DOMAIN_MAX_SESSIONS_{name}", max_sessions)),
+        "navigations_per_minute": float(os.getenv(f"DOMAIN_NAVIGATIONS_PER_MINUTE_{name}", navigations_per_minute)),
+    }
+
+
+# Site scraped by each browser source, with the most browser sessions open on
+# it at once and the most page navigations per minute across those sessions
+DOMAIN_LIMITS = {
+    "infogreffe": _domain("infogreffe", "infogreffe.fr", "2", "20"),
+    "pappers": _domain("pappers", "pappers.fr", "2", "20"),
+    "societe": _domain("societe", "societe.com", "2", "20"),
+    "google": _domain("google", "google.com", "3", "30"),
+}
+
+
+def domain_limits_for(source):
+    """Return the domain limits of a source, or None for sources without a browser"""
+    return DOMAIN_LIMITS.get(source)
+
+# Browser sources whose sessions reuse a persistent profile (cookies, consent
+# choices, HTTP cache). Pappers is left out: its task starts by clearing
+# cookies and cache, to look like a new visitor.
+BROWSER_PROFILE_SOURCES = {
+    source.strip() for source in os.getenv("BROWSER_PROFILE_SOURCES", "infogreffe,societe,google").split(",")
+    if source.strip()
+}
+
+
+def uses_browser_profile(source):
+    """Whether a source's browser sessions keep a persistent profile"""
+    return source in BROWSER_PROFILE_SOURCES
@@ -1,2 +1,16 @@
 from .ellisphere_helper import *
 from .societe_api_helper import *
+from .cassette import *
+from .llm_limiter import *
+from .event_loop import *
+from .llm_client import *
+from .cancellation import *
+from .browser_sessions import *
+from .identifiers import *
+from .worker_pool import *
+from .site_limiter import *
+from .circuit_breaker import *
+from .hedging import *
+from .adaptive_concurrency import *
+from .browser_memory import *
+from .browser_profiles import *
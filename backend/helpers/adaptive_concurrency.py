@@ -0,0 +1,170 @@
+from dotenv import load_dotenv
+from helpers.llm_limiter import llm_rate_limiter
+from helpers.site_limiter import domain_limiter
+import os
+import psutil
+import threading
+import time
+
+load_dotenv()
+
+# Seconds between adjustments of the concurrency limits
+CONCURRENCY_INTERVAL = float(os.getenv("CONCURRENCY_INTERVAL", "10"))
+# Share of failed attempts in an interval that halves a source's sessions
+CONCURRENCY_ERROR_RATE = float(os.getenv("CONCURRENCY_ERROR_RATE", "0.3"))
+# Median attempt duration, relative to the source's usual one, that halves its sessions
+CONCURRENCY_LATENCY_FACTOR = float(os.getenv("CONCURRENCY_LATENCY_FACTOR", "2.0"))
+# Host memory use (percent) above which the browser pool shrinks
+CONCURRENCY_MEMORY_HIGH = float(os.getenv("CONCURRENCY_MEMORY_HIGH", "85"))
+# Factor applied to a limit on each decrease
+CONCURRENCY_DECREASE_FACTOR = float(os.getenv("CONCURRENCY_DECREASE_FACTOR", "0.5"))
+
+# Weight of the latest interval in a source's usual duration
+BASELINE_WEIGHT = 0.2
+
+
+class SourceWindow:
+    """Outcomes of a source's attempts during the current interval"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.failures = 0
+        self.latencies = []
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller of the browser session limits. Every interval it halves
+    a source's domain session limit when the source's error rate or median
+    latency went up, and raises it by one while sessions are waited for.
+    The global browser pool shrinks the same way when host memory runs high
+    or the LLM provider throttles us, and grows back while sessions are
+    waited for. The limits themselves live in the domain limiter.
+    """
+
+    def __init__(self, limiter=domain_limiter, interval=CONCURRENCY_INTERVAL):
+        self.limiter = limiter
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._sources = {}
+        self._pool = {"decreases": 0, "increases": 0, "last_decision": None, "memory_percent": None}
+        self._rate_limited = llm_rate_limiter.snapshot()["rate_limited"]
+        self._thread = None
+
+    def record(self, source, seconds, ok):
+        """
+        Report how long one browser run of a source took, from the moment it
+        got its session and memory, and whether the site gave a result
+        """
+        with self._lock:
+            window = self._windows.setdefault(source, SourceWindow())
+            window.attempts += 1
+            window.latencies.append(seconds)
+            if not ok:
+                window.failures += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="concurrency-controller", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.adjust()
+            except Exception as e:
+                print(f"Warning: Concurrency adjustment failed: {str(e)}")
+
+    def _source_state(self, source):
+        return self._sources.setdefault(source, {
+            "baseline_latency": None, "decreases": 0, "increases": 0, "last_decision": None, "last_window": None})
+
+    def adjust(self):
+        """Apply one round of additive increases and multiplicative decreases"""
+        with self._lock:
+            windows, self._windows = self._windows, {}
+        waiting = {domain: entry["waiting_sessions"] for domain, entry in self.limiter.snapshot().items()}
+
+        for source in set(windows) | set(self._sources):
+            limits = self.limiter.session_limits(source)
+            if limits is None:
+                continue
+            limit, max_sessions = limits
+            window = windows.get(source, SourceWindow())
+            with self._lock:
+                state = self._source_state(source)
+            median = sorted(window.latencies)[len(window.latencies) // 2] if window.latencies else None
+            error_rate = window.failures / window.attempts if window.attempts else 0.0
+            baseline = state["baseline_latency"]
+
+            if window.attempts and error_rate > CONCURRENCY_ERROR_RATE:
+                decision = "decrease: errors"
+            elif median is not None and baseline and median > baseline * CONCURRENCY_LATENCY_FACTOR:
+                decision = "decrease: latency"
+            elif waiting.get(self.limiter.domain_for(source)) and limit < max_sessions:
+                decision = "increase"
+            else:
+                decision = "hold"
+
+            if decision.startswith("decrease"):
+                self.limiter.set_session_limit(source, int(limit * CONCURRENCY_DECREASE_FACTOR))
+            elif decision == "increase":
+                self.limiter.set_session_limit(source, limit + 1)
+
+            with self._lock:
+                if decision.startswith("decrease"):
+                    state["decreases"] += 1
+                elif decision == "increase":
+                    state["increases"] += 1
+                state["last_decision"] = decision
+                state["last_window"] = {"attempts": window.attempts, "error_rate": error_rate, "median_latency": median}
+                if median is not None and decision != "decrease: latency":
+                    # Slow intervals are not folded in, so they cannot become the usual duration
+                    state["baseline_latency"] = (
+                        median if baseline is None else (1 - BASELINE_WEIGHT) * baseline + BASELINE_WEIGHT * median)
+
+        self._adjust_pool()
+
+    def _adjust_pool(self):
+        pool = self.limiter.pool_snapshot()
+        memory = psutil.virtual_memory().percent
+        rate_limited = llm_rate_limiter.snapshot()["rate_limited"]
+        throttled = rate_limited > self._rate_limited
+        self._rate_limited = rate_limited
+
+        if memory > CONCURRENCY_MEMORY_HIGH:
+            decision = "decrease: memory"
+        elif throttled:
+            decision = "decrease: llm throttled"
+        elif pool["waiting"] and pool["size"] < pool["max_size"]:
+            decision = "increase"
+        else:
+            decision = "hold"
+
+        if decision.startswith("decrease"):
+            self.limiter.set_pool_size(int(pool["size"] * CONCURRENCY_DECREASE_FACTOR))
+        elif decision == "increase":
+            self.limiter.set_pool_size(pool["size"] + 1)
+
+        with self._lock:
+            if decision.startswith("decrease"):
+                self._pool["decreases"] += 1
+            elif decision == "increase":
+                self._pool["increases"] += 1
+            self._pool["last_decision"] = decision
+            self._pool["memory_percent"] = memory
+
+    def snapshot(self):
+        """Current limits with the outcome of the last adjustment"""
+        pool = self.limiter.pool_snapshot()
+        with self._lock:
+            sources = {}
+            for source, state in self._sources.items():
+                limit, max_sessions = self.limiter.session_limits(source)
+                sources[source] = dict(state, session_limit=limit, max_sessions=max_sessions)
+            return {"browser_pool": dict(pool, **self._pool), "sources": sources}
+
+
+concurrency_controller = AdaptiveConcurrency()
@@ -0,0 +1,185 @@
+from collections import deque
+from dotenv import load_dotenv
+from helpers.browser_sessions import browser_pid, browser_process_tree, kill_process_tree
+import asyncio
+import os
+import psutil
+import threading
+import time
+
+load_dotenv()
+
+# New browser sessions start only while host memory use (percent), counting
+# the expected size of the sessions still starting, stays below this
+BROWSER_ADMISSION_MEMORY_PERCENT = float(os.getenv("BROWSER_ADMISSION_MEMORY_PERCENT", "80"))
+# Expected size of a browser process tree until sessions have been measured (MB)
+BROWSER_SESSION_MEMORY_ESTIMATE_MB = float(os.getenv("BROWSER_SESSION_MEMORY_ESTIMATE_MB", "500"))
+# A session whose process tree grows past this is killed (MB)
+BROWSER_SESSION_MEMORY_CAP_MB = float(os.getenv("BROWSER_SESSION_MEMORY_CAP_MB", "2000"))
+# Seconds between measurements of the browser process trees
+BROWSER_MEMORY_CHECK_INTERVAL = float(os.getenv("BROWSER_MEMORY_CHECK_INTERVAL", "5"))
+
+MB = 1024 * 1024
+POLL_INTERVAL = 0.5
+# Finished sessions whose peak size makes up the estimate
+PEAK_HISTORY = 20
+
+
+class BrowserMemoryExceeded(Exception):
+    """Raised when a browser session was killed for going over its memory cap"""
+
+    def __init__(self, message, partial_result=None):
+        super().__init__(message)
+        self.partial_result = partial_result
+
+
+def tree_rss(processes):
+    """Resident memory of a list of processes, in bytes"""
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
+
+
+class BrowserEntry:
+    """One admitted browser session and its measured memory"""
+
+    def __init__(self, source):
+        self.source = source
+        self.session = None
+        self.run_task = None
+        self.loop = None
+        self.rss = None
+        self.peak = 0
+        self.killed = False
+
+    def attach(self, browser_session, run_task):
+        """Link the entry to the session and the task running its agent, once they exist"""
+        self.session = browser_session
+        self.run_task = run_task
+        self.loop = asyncio.get_running_loop()
+
+
+class BrowserMemoryGuard:
+    """
+    Admission control and per-session memory cap for Chromium. A session is
+    admitted only while host memory, plus the expected size of each session
+    not measured yet, stays under the admission threshold; the expected size
+    is the average peak of recent sessions. A background thread measures the
+    RSS of every browser process tree and kills a session going over the cap,
+    cancelling its agent.
+    """
+
+    def __init__(self, threshold=BROWSER_ADMISSION_MEMORY_PERCENT, estimate_mb=BROWSER_SESSION_MEMORY_ESTIMATE_MB,
+                 cap_mb=BROWSER_SESSION_MEMORY_CAP_MB, interval=BROWSER_MEMORY_CHECK_INTERVAL):
+        self.threshold = threshold
+        self.estimate = estimate_mb * MB
+        self.cap = cap_mb * MB
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._entries = []
+        self._peaks = deque(maxlen=PEAK_HISTORY)
+        self._thread = None
+        self._stats = {"admitted": 0, "delayed": 0, "refused": 0, "killed": 0, "total_wait": 0.0}
+
+    def session_estimate(self):
+        """Expected size of a browser process tree, in bytes"""
+        with self._lock:
+            return sum(self._peaks) / len(self._peaks) if self._peaks else self.estimate
+
+    def _fits(self):
+        memory = psutil.virtual_memory()
+        estimate = self.session_estimate()
+        with self._lock:
+            unmeasured = sum(1 for entry in self._entries if entry.rss is None)
+        projected = memory.total - memory.available + estimate * (unmeasured + 1)
+        return projected / memory.total * 100 < self.threshold
+
+    async def admit(self, source, timeout=None):
+        """Wait until memory allows one more browser; returns its entry, or None after `timeout`"""
+        started = time.monotonic()
+        delayed = False
+        while not self._fits():
+            if timeout is not None and time.monotonic() - started >= timeout:
+                with self._lock:
+                    self._stats["refused"] += 1
+                return None
+            delayed = True
+            await asyncio.sleep(POLL_INTERVAL)
+        entry = BrowserEntry(source)
+        with self._lock:
+            self._entries.append(entry)
+            self._stats["admitted"] += 1
+            self._stats["total_wait"] += time.monotonic() - started
+            if delayed:
+                self._stats["delayed"] += 1
+        self.start()
+        return entry
+
+    def release(self, entry):
+        with self._lock:
+            if entry in self._entries:
+                self._entries.remove(entry)
+            if entry.peak:
+                self._peaks.append(entry.peak)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._monitor, name="browser-memory-guard", daemon=True)
+                self._thread.start()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Warning: Browser memory check failed: {str(e)}")
+
+    def check(self):
+        """Measure every browser process tree and kill the sessions over the cap"""
+        with self._lock:
+            entries = list(self._entries)
+        for entry in entries:
+            pid = browser_pid(entry.session) if entry.session is not None else None
+            if not pid or entry.killed:
+                continue
+            processes = browser_process_tree(pid)
+            entry.rss = tree_rss(processes)
+            entry.peak = max(entry.peak, entry.rss)
+            if entry.rss > self.cap:
+                print(f"Warning: Killing the {entry.source} browser using {entry.rss / MB:.0f} MB "
+                      f"(cap {self.cap / MB:.0f} MB)")
+                entry.killed = True
+                kill_process_tree(processes)
+                with self._lock:
+                    self._stats["killed"] += 1
+                if entry.run_task is not None:
+                    entry.loop.call_soon_threadsafe(entry.run_task.cancel)
+
+    def snapshot(self):
+        memory = psutil.virtual_memory()
+        estimate = self.session_estimate()
+        with self._lock:
+            sessions = [
+                {"source": entry.source, "rss_mb": entry.rss / MB if entry.rss is not None else None,
+                 "peak_mb": entry.peak / MB}
+                for entry in self._entries
+            ]
+            return dict(
+                self._stats,
+                sessions=sessions,
+                browser_rss_mb=sum(session["rss_mb"] or 0 for session in sessions),
+                session_estimate_mb=estimate / MB,
+                memory_percent=memory.percent,
+                available_mb=memory.available / MB,
+                admission_threshold_percent=self.threshold,
+                session_cap_mb=self.cap / MB,
+            )
+
+
+browser_memory = BrowserMemoryGuard()
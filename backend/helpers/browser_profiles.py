@@ -0,0 +1,136 @@
+from config.scrapers import uses_browser_profile
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+import fcntl
+import os
+import psutil
+import shutil
+import threading
+import time
+
+load_dotenv()
+
+# Directory holding the persistent browser profiles, one subdirectory per source
+BROWSER_PROFILES_DIR = os.getenv("BROWSER_PROFILES_DIR", "data/browser-profiles")
+# Profiles kept per source; a session finding them all in use starts with a fresh one
+BROWSER_PROFILE_SLOTS = int(os.getenv("BROWSER_PROFILE_SLOTS", "4"))
+# Age (seconds) after which a profile is wiped, so cookies and cache do not pile up forever
+BROWSER_PROFILE_MAX_AGE = float(os.getenv("BROWSER_PROFILE_MAX_AGE", "604800"))
+# Size of each profile's HTTP disk cache (MB)
+BROWSER_PROFILE_CACHE_MB = int(os.getenv("BROWSER_PROFILE_CACHE_MB", "200"))
+
+# Marks when a profile was created, for BROWSER_PROFILE_MAX_AGE
+CREATED_MARKER = ".created"
+
+
+def browser_holding(path):
+    """PID of a running Chromium using a profile directory, from its SingletonLock, or None"""
+    try:
+        target = os.readlink(os.path.join(path, "SingletonLock"))
+        pid = int(target.rsplit("-", 1)[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pid if psutil.pid_exists(pid) else None
+
+
+class BrowserProfiles:
+    """
+    Persistent Chromium profiles, so sessions on a source keep its cookies,
+    cookie-consent choice and HTTP cache from one run to the next. Each source
+    has a few profile slots; a session leases one exclusively with an flock
+    held until its browser is closed, so two sessions, in this process or any
+    other worker sharing the directory, never open the same profile. A slot
+    still used by a Chromium that outlived its worker is skipped too.
+    """
+
+    def __init__(self, root=BROWSER_PROFILES_DIR, slots=BROWSER_PROFILE_SLOTS, max_age=BROWSER_PROFILE_MAX_AGE,
+                 cache_mb=BROWSER_PROFILE_CACHE_MB):
+        self.root = root
+        self.slots = slots
+        self.max_age = max_age
+        self.cache_mb = cache_mb
+        self._lock = threading.Lock()
+        self._leased = {}
+        self._stats = {}
+
+    def _source_stats(self, source):
+        return self._stats.setdefault(source, {"leases": 0, "reused": 0, "created": 0, "expired": 0, "all_busy": 0})
+
+    def _try_slot(self, source, slot):
+        """Lock a slot of the source; returns (lock file, path), or None if it is in use"""
+        path = os.path.join(self.root, source, str(slot))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        if browser_holding(path):
+            lock_file.close()
+            return None
+        return lock_file, path
+
+    def _prepare(self, source, path):
+        """Wipe the profile if it is too old and create it if missing; returns whether it was reused"""
+        marker = os.path.join(path, CREATED_MARKER)
+        if os.path.exists(marker) and time.time() - os.path.getmtime(marker) > self.max_age:
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._source_stats(source)["expired"] += 1
+        if os.path.exists(marker):
+            return True
+        os.makedirs(path, exist_ok=True)
+        open(marker, "w").close()
+        return False
+
+    @asynccontextmanager
+    async def lease(self, source):
+        """
+        Yield the BrowserSession options of a profile leased for the block,
+        or no options (a throwaway profile) when the source keeps none or
+        all of its slots are in use. The block must close the browser.
+        """
+        if not uses_browser_profile(source) or self.slots <= 0:
+            yield {}
+            return
+        leased = None
+        for slot in range(self.slots):
+            leased = self._try_slot(source, slot)
+            if leased is not None:
+                break
+        if leased is None:
+            with self._lock:
+                self._source_stats(source)["all_busy"] += 1
+            print(f"Warning: All {self.slots} {source} browser profiles are in use, starting a fresh one")
+            yield {}
+            return
+
+        lock_file, path = leased
+        try:
+            reused = self._prepare(source, path)
+            with self._lock:
+                stats = self._source_stats(source)
+                stats["leases"] += 1
+                stats["reused" if reused else "created"] += 1
+                self._leased[source] = self._leased.get(source, 0) + 1
+            try:
+                yield {"user_data_dir": path, "args": [f"--disk-cache-size={self.cache_mb * 1024 * 1024}"]}
+            finally:
+                with self._lock:
+                    self._leased[source] -= 1
+        finally:
+            lock_file.close()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "directory": self.root,
+                "slots": self.slots,
+                "sources": {
+                    source: dict(stats, in_use=self._leased.get(source, 0)) for source, stats in self._stats.items()
+                },
+            }
+
+
+browser_profiles = BrowserProfiles()
@@ -0,0 +1,167 @@
+from browser_use import BrowserSession
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+import asyncio
+import os
+import psutil
+import threading
+import time
+
+load_dotenv()
+
+# Seconds to wait for browser-use to shut a browser down before killing it
+BROWSER_CLOSE_TIMEOUT = 10
+# Seconds between sweeps for orphaned browser processes
+BROWSER_REAPER_INTERVAL = float(os.getenv("BROWSER_REAPER_INTERVAL", "60"))
+# Age (seconds) before an untracked browser of this process counts as orphaned,
+# so a browser still starting is never mistaken for one
+BROWSER_REAPER_GRACE = float(os.getenv("BROWSER_REAPER_GRACE", "120"))
+
+# Extra Chromium switch naming the API process that launched the browser
+OWNER_SWITCH = "--intersud-owner-pid"
+
+
+def browser_pid(browser_session):
+    """PID of the Chromium process launched for a local session, if any"""
+    watchdog = getattr(browser_session, "_local_browser_watchdog", None)
+    return getattr(watchdog, "browser_pid", None) if watchdog is not None else None
+
+
+def browser_process_tree(pid):
+    """The browser process and all of its descendants (renderers, GPU, utilities)"""
+    try:
+        process = psutil.Process(pid)
+        return [process] + process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return []
+
+
+def kill_process_tree(processes):
+    """Kill the given processes, ignoring the ones that already exited"""
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(processes, timeout=3)
+
+
+def owner_pid(cmdline):
+    """PID of the API process that launched a browser, from its command line, or None if not ours"""
+    for arg in cmdline or ():
+        if arg.startswith(f"{OWNER_SWITCH}="):
+            try:
+                return int(arg.split("=", 1)[1])
+            except ValueError:
+                return None
+    return None
+
+
+async def close_browser_session(browser_session):
+    """
+    Shut a browser session down, including its Chromium child processes.
+    browser-use only terminates the main browser process, so any process of
+    its tree still alive afterwards is killed directly. Returns how many
+    processes had to be killed that way.
+    """
+    pid = browser_pid(browser_session)
+    processes = browser_process_tree(pid) if pid else []
+    try:
+        await asyncio.wait_for(browser_session.kill(), timeout=BROWSER_CLOSE_TIMEOUT)
+    except Exception as e:
+        print(f"Warning: Browser session did not shut down cleanly: {e!r}")
+
+    survivors = [process for process in processes if process.is_running()]
+    if survivors:
+        await asyncio.to_thread(kill_process_tree, survivors)
+    return len(survivors)
+
+
+class BrowserLifecycle:
+    """
+    Opens and always closes the browser sessions of this process, and reaps
+    the ones it missed. Every browser is launched with a switch naming this
+    process; a background sweep kills browsers whose owner process is gone
+    (a crashed worker) and browsers of this process no session tracks any
+    more, with their whole process tree.
+    """
+
+    def __init__(self, interval=BROWSER_REAPER_INTERVAL, grace=BROWSER_REAPER_GRACE):
+        self.interval = interval
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._thread = None
+        self._stats = {
+            "opened": 0,
+            "closed": 0,
+            # Processes still running after browser-use shut their session down
+            "leaked_processes": 0,
+            "reaped_browsers": 0,
+            "reaped_processes": 0,
+        }
+
+    @asynccontextmanager
+    async def session(self, **options):
+        """Yield a new BrowserSession, closed with all of its processes however the block exits"""
+        options["args"] = list(options.get("args") or []) + [f"{OWNER_SWITCH}={os.getpid()}"]
+        browser_session = BrowserSession(**options)
+        with self._lock:
+            self._sessions.add(browser_session)
+            self._stats["opened"] += 1
+        self.start()
+        try:
+            yield browser_session
+        finally:
+            leaked = await close_browser_session(browser_session)
+            with self._lock:
+                self._sessions.discard(browser_session)
+                self._stats["closed"] += 1
+                self._stats["leaked_processes"] += leaked
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._reaper_loop, name="browser-reaper", daemon=True)
+                self._thread.start()
+
+    def _reaper_loop(self):
+        while True:
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Warning: Browser reaper failed: {str(e)}")
+            time.sleep(self.interval)
+
+    def reap(self):
+        """Kill orphaned browsers and their process trees; returns how many browsers were reaped"""
+        with self._lock:
+            tracked = {browser_pid(session) for session in self._sessions}
+        me = os.getpid()
+        now = time.time()
+        reaped = 0
+        for process in psutil.process_iter(["pid", "cmdline", "create_time"]):
+            owner = owner_pid(process.info["cmdline"])
+            if owner is None:
+                continue
+            if owner == me:
+                orphaned = process.info["pid"] not in tracked and now - process.info["create_time"] > self.grace
+            else:
+                orphaned = not psutil.pid_exists(owner)
+            if not orphaned:
+                continue
+            processes = browser_process_tree(process.info["pid"])
+            print(f"Warning: Killing orphaned browser {process.info['pid']} ({len(processes)} processes)")
+            kill_process_tree(processes)
+            reaped += 1
+            with self._lock:
+                self._stats["reaped_browsers"] += 1
+                self._stats["reaped_processes"] += len(processes)
+        return reaped
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._stats, open=len(self._sessions))
+
+
+browser_lifecycle = BrowserLifecycle()
@@ -0,0 +1,60 @@
+import threading
+
+
+class TaskCancelled(Exception):
+    """Raised in a task's worker thread once the task has been cancelled"""
+
+
+class TaskCancellation:
+    """
+    Tracks the shared-loop futures each task is waiting on, so cancelling a
+    task cancels its running scraper or LLM coroutine (which closes its
+    browser session) and releases the worker thread straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._cancelled = set()
+
+    def track(self, task_id, future):
+        with self._lock:
+            if task_id in self._cancelled:
+                future.cancel()
+                return
+            self._futures.setdefault(task_id, set()).add(future)
+
+    def untrack(self, task_id, future):
+        with self._lock:
+            futures = self._futures.get(task_id)
+            if futures is not None:
+                futures.discard(future)
+                if not futures:
+                    del self._futures[task_id]
+
+    def cancel(self, task_id):
+        """Mark a task running here cancelled and cancel everything it is waiting on"""
+        with self._lock:
+            futures = self._futures.pop(task_id, set())
+            if futures:
+                # Tasks not running here are stopped through their stored status
+                self._cancelled.add(task_id)
+        for future in futures:
+            future.cancel()
+        return len(futures)
+
+    def is_cancelled(self, task_id):
+        return task_id in self._cancelled
+
+    def release(self, task_id):
+        """Forget a task once its worker thread has finished"""
+        with self._lock:
+            self._cancelled.discard(task_id)
+            self._futures.pop(task_id, None)
+
+    def snapshot(self):
+        with self._lock:
+            return {"tasks_tracked": len(self._futures), "tasks_cancelled": len(self._cancelled)}
+
+
+task_cancellation = TaskCancellation()
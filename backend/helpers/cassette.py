@@ -0,0 +1,224 @@
+from collections import defaultdict, deque
+from dotenv import load_dotenv
+import asyncio
+import base64
+import functools
+import gzip
+import hashlib
+import httpx
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+
+# "off", "record" or "replay"
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/cassette.jsonl.gz")
+# "original" replays with the recorded durations, "zero" without waiting
+CASSETTE_TIMING = os.getenv("CASSETTE_TIMING", "original").lower()
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when the cassette has no entry for a call"""
+
+
+class RecordedCallError(Exception):
+    """Replays an exception raised by the original call"""
+
+
+def cassette_key(*parts):
+    """Stable key for a call, built from its JSON-serialisable arguments"""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Gzipped JSON-lines file of external interactions. In record mode each call
+    is appended as it completes; in replay mode calls are served from the file,
+    matched by kind and key, in recorded order.
+    """
+
+    def __init__(self, mode=CASSETTE_MODE, path=CASSETTE_PATH, timing=CASSETTE_TIMING):
+        self.mode = mode
+        self.path = path
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._entries = defaultdict(deque)
+        self._by_kind = defaultdict(deque)
+        if self.mode == "replay":
+            self.load()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def load(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_kind.clear()
+            with gzip.open(self.path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[(entry["kind"], entry["key"])].append(entry)
+                        self._by_kind[entry["kind"]].append(entry)
+
+    def record(self, kind, key, request, response, elapsed, error=None):
+        entry = {
+            "kind": kind,
+            "key": key,
+            "request": request,
+            "response": response,
+            "error": error,
+            "elapsed": elapsed,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, default=str, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                file.write(line)
+
+    def replay(self, kind, key, fallback_to_kind=False):
+        """Pop the next recorded entry for this call"""
+        with self._lock:
+            queue = self._entries.get((kind, key))
+            if not queue and fallback_to_kind:
+                # Same kind of call with a different payload, take the next in order
+                for candidate in self._by_kind.get(kind, ()):
+                    if candidate.get("_used") is None:
+                        queue = self._entries[(kind, candidate["key"])]
+                        break
+            if not queue:
+                raise CassetteMiss(f"No recorded '{kind}' call for key {key}")
+            entry = queue.popleft()
+            entry["_used"] = True
+            return entry
+
+    def delay(self, entry):
+        return entry.get("elapsed", 0) if self.timing == "original" else 0
+
+
+cassette = Cassette()
+
+
+def cassette_call(kind, key=None):
+    """
+    Record or replay a sync or async function's return value.
+    `key` maps the call arguments to the values that identify it (all arguments by default).
+    """
+    def call_key(args, kwargs):
+        parts = key(*args, **kwargs) if key is not None else (args, kwargs)
+        return cassette_key(kind, parts)
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if cassette.replaying:
+                    entry = cassette.replay(kind, call_key(args, kwargs))
+                    await asyncio.sleep(cassette.delay(entry))
+                    if entry["error"] is not None:
+                        raise RecordedCallError(entry["error"])
+                    return entry["response"]
+                if not cassette.recording:
+                    return await fn(*args, **kwargs)
+
+                started = time.monotonic()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    cassette.record(kind, call_key(args, kwargs), None, None, time.monotonic() - started, error=str(e))
+                    raise
+                cassette.record(kind, call_key(args, kwargs), None, result, time.monotonic() - started)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if cassette.replaying:
+                entry = cassette.replay(kind, call_key(args, kwargs))
+                time.sleep(cassette.delay(entry))
+                if entry["error"] is not None:
+                    raise RecordedCallError(entry["error"])
+                return entry["response"]
+            if not cassette.recording:
+                return fn(*args, **kwargs)
+
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                cassette.record(kind, call_key(args, kwargs), None, None, time.monotonic() - started, error=str(e))
+                raise
+            cassette.record(kind, call_key(args, kwargs), None, result, time.monotonic() - started)
+            return result
+        return wrapper
+
+    return decorator
+
+
+def _http_request_key(request):
+    return cassette_key("llm_http", request.method, request.url.path, hashlib.sha256(request.content).hexdigest())
+
+
+# Headers that no longer describe the body once httpx has decoded it
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records every LLM request and response to the cassette"""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        started = time.monotonic()
+        response = await self._transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        headers = [(name, value) for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS]
+        cassette.record(
+            "llm_http",
+            _http_request_key(request),
+            {"method": request.method, "url": str(request.url), "body": request.content.decode("utf-8", errors="replace")},
+            {"status_code": response.status_code, "headers": headers, "body": base64.b64encode(body).decode("ascii")},
+            time.monotonic() - started,
+        )
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers LLM requests from the cassette"""
+
+    async def handle_async_request(self, request):
+        entry = cassette.replay("llm_http", _http_request_key(request), fallback_to_kind=True)
+        await asyncio.sleep(cassette.delay(entry))
+        response = entry["response"]
+        return httpx.Response(
+            response["status_code"],
+            headers=response["headers"],
+            content=base64.b64decode(response["body"]),
+            request=request,
+        )
+
+
+def wrap_transport(transport):
+    """Wrap the real LLM transport according to the cassette mode"""
+    if cassette.replaying:
+        return ReplayTransport()
+    if cassette.recording:
+        return RecordingTransport(transport)
+    return transport
@@ -0,0 +1,126 @@
+from dotenv import load_dotenv
+from helpers.site_limiter import is_site_error
+import asyncio
+import httpx
+import openai
+import os
+import requests
+import threading
+import time
+
+load_dotenv()
+
+# Consecutive failed attempts on a source before its circuit opens
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit skips its source before letting one probe through
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "300"))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a source whose circuit is open"""
+
+    def __init__(self, source):
+        super().__init__(f"{source} is unavailable after repeated failures")
+        self.source = source
+
+
+# Errors of a failed attempt that another attempt may not run into
+TRANSIENT_ERRORS = (
+    ConnectionError, asyncio.TimeoutError, httpx.TransportError,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+    openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError,
+)
+
+
+def is_transient(error):
+    """Whether a failed attempt is worth retrying: network trouble, throttling or a server error"""
+    if isinstance(error, TRANSIENT_ERRORS) or is_site_error([str(error)]):
+        return True
+    # Provider errors wrapped by browser-use keep the HTTP status, httpx and requests errors their response
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class Circuit:
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.stats = {"successes": 0, "failures": 0, "opened": 0, "rejected": 0}
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker shared by every task in the process. After
+    `threshold` consecutive failures a source is skipped for `reset_after`
+    seconds; then a single probe attempt is let through (half open), which
+    closes the circuit on success or opens it again on failure.
+    """
+
+    def __init__(self, threshold=CIRCUIT_FAILURE_THRESHOLD, reset_after=CIRCUIT_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    def _circuit(self, source):
+        circuit = self._circuits.get(source)
+        if circuit is None:
+            circuit = self._circuits[source] = Circuit()
+        return circuit
+
+    def allow(self, source):
+        """Whether an attempt on the source may run now"""
+        with self._lock:
+            circuit = self._circuit(source)
+            if circuit.state == "open" and time.monotonic() - circuit.opened_at >= self.reset_after:
+                circuit.state = "half_open"
+            if circuit.state == "closed" or (circuit.state == "half_open" and not circuit.probing):
+                circuit.probing = circuit.state == "half_open"
+                return True
+            circuit.stats["rejected"] += 1
+            return False
+
+    def record_success(self, source):
+        with self._lock:
+            circuit = self._circuit(source)
+            if circuit.state != "closed":
+                print(f"{source} recovered, closing its circuit")
+            circuit.state = "closed"
+            circuit.failures = 0
+            circuit.probing = False
+            circuit.stats["successes"] += 1
+
+    def record_failure(self, source):
+        with self._lock:
+            circuit = self._circuit(source)
+            circuit.failures += 1
+            circuit.stats["failures"] += 1
+            if circuit.state == "half_open" or (circuit.state == "closed" and circuit.failures >= self.threshold):
+                circuit.state = "open"
+                circuit.opened_at = time.monotonic()
+                circuit.stats["opened"] += 1
+                print(f"Warning: Opening the circuit of {source} after {circuit.failures} failures")
+            circuit.probing = False
+
+    def abandon(self, source):
+        """Forget an attempt that ended without an outcome (e.g. the task was cancelled)"""
+        with self._lock:
+            self._circuit(source).probing = False
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            snapshot = {}
+            for source, circuit in self._circuits.items():
+                snapshot[source] = dict(circuit.stats)
+                snapshot[source].update({
+                    "state": circuit.state,
+                    "consecutive_failures": circuit.failures,
+                    "open_for": max(circuit.opened_at + self.reset_after - now, 0.0) if circuit.state == "open" else 0.0,
+                })
+            return snapshot
+
+
+source_breaker = CircuitBreaker()
@@ -2,6 +2,7 @@ import requests
 import xml.etree.ElementTree as ET
 import json
 import os
+from .cassette import cassette_call
 
 ellisphere_api_url = "https://services.data-access-gateway.com/1/rest/svcOnlineOrder"
 
@@ -80,6 +81,7 @@ def get_detailed_report_request(siren, year):
 siren = 552134736
 
 
+@cassette_call("ellisphere_years")
 def get_year_data(siren):
     """
     Make a POST request to get year data for a given SIREN
@@ -129,6 +131,7 @@ def get_year_data(siren):
         }
 
 
+@cassette_call("ellisphere_report")
 def get_detailed_report_data(siren, year):
     """
     Make a POST request to get detailed report data for a given SIREN and year
@@ -213,6 +216,7 @@ def get_years_from_ellisphere(xml: str) -> list:
         return []
 
 
+@cassette_call("ellisphere_periods")
 def parse_periods_from_file(company_id=None):
     """
     Parse all periods from the local detailed-reports.xml file.
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+# One long-lived event loop, running in a background thread, that every async
+# scraper, agent and LLM call is submitted to. Keeping a single loop lets the
+# pooled HTTP connections be reused across tasks instead of dying with a
+# per-call loop.
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def get_shared_loop():
+    """Return the shared event loop, starting its thread on first use"""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None or _shared_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="shared-event-loop",
+                daemon=True
+            )
+            thread.start()
+            _shared_loop = loop
+        return _shared_loop
+
+
+def submit_to_shared_loop(coro):
+    """Schedule a coroutine on the shared loop and return its concurrent future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_loop())
+
+
+def run_on_shared_loop(coro):
+    """Run a coroutine on the shared loop and block until it finishes"""
+    return submit_to_shared_loop(coro).result()
@@ -0,0 +1,139 @@
+from collections import deque
+from dotenv import load_dotenv
+from helpers.site_limiter import domain_limiter
+import asyncio
+import os
+import threading
+import time
+
+load_dotenv()
+
+# Start a second attempt when a browser scraper runs longer than usual
+SCRAPER_HEDGING = os.getenv("SCRAPER_HEDGING", "false").lower() in ("1", "true", "yes")
+# Duration percentile after which the second attempt starts
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+# Successful runs of a source needed before it is hedged, and runs remembered
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+HEDGE_HISTORY = int(os.getenv("HEDGE_HISTORY", "100"))
+# Second attempts running at once on one domain
+HEDGE_MAX_PER_DOMAIN = int(os.getenv("HEDGE_MAX_PER_DOMAIN", "1"))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class ScraperHedger:
+    """
+    Records how long each source's successful attempts take and, when hedging
+    is on, starts a second attempt on a fresh browser session once the first
+    runs past the source's usual (p90) duration. The first attempt to succeed
+    wins and the other one is cancelled, which closes its browser. Only a few
+    second attempts may run per domain at once, so hedging cannot double the
+    load on a site that is slow for everyone.
+    """
+
+    def __init__(self, enabled=SCRAPER_HEDGING, pct=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES,
+                 history=HEDGE_HISTORY, max_per_domain=HEDGE_MAX_PER_DOMAIN):
+        self.enabled = enabled
+        self.pct = pct
+        self.min_samples = min_samples
+        self.history = history
+        self.max_per_domain = max_per_domain
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._hedging = {}
+        self._stats = {}
+
+    def _source_stats(self, source):
+        return self._stats.setdefault(source, {"runs": 0, "hedged": 0, "hedge_wins": 0, "hedges_capped": 0})
+
+    def record(self, source, seconds):
+        with self._lock:
+            self._durations.setdefault(source, deque(maxlen=self.history)).append(seconds)
+
+    def hedge_after(self, source):
+        """Seconds after which a source's attempt is hedged, or None if it is not"""
+        if not self.enabled or domain_limiter.domain_for(source) is None:
+            return None
+        with self._lock:
+            durations = self._durations.get(source)
+            if not durations or len(durations) < self.min_samples:
+                return None
+            return percentile(durations, self.pct)
+
+    def _acquire_hedge(self, source):
+        domain = domain_limiter.domain_for(source)
+        with self._lock:
+            if self._hedging.get(domain, 0) >= self.max_per_domain:
+                self._source_stats(source)["hedges_capped"] += 1
+                return None
+            self._hedging[domain] = self._hedging.get(domain, 0) + 1
+            self._source_stats(source)["hedged"] += 1
+            return domain
+
+    def _release_hedge(self, domain):
+        with self._lock:
+            self._hedging[domain] -= 1
+
+    async def run(self, source, start, timeout=None):
+        """
+        Run `start(timeout)`, the coroutine of one attempt, hedging it with a
+        second `start` given the rest of the budget if it is slow
+        """
+        with self._lock:
+            self._source_stats(source)["runs"] += 1
+        first = asyncio.ensure_future(start(timeout))
+        attempts = [first]
+        started = {first: time.monotonic()}
+        hedge_domain = None
+        try:
+            delay = self.hedge_after(source)
+            if delay is not None and (timeout is None or delay < timeout):
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    hedge_domain = self._acquire_hedge(source)
+                if hedge_domain is not None:
+                    print(f"Hedging {source} after {delay:.1f}s")
+                    second = asyncio.ensure_future(start(timeout - delay if timeout else None))
+                    attempts.append(second)
+                    started[second] = time.monotonic()
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self.record(source, time.monotonic() - started[attempt])
+                        if attempt is not first:
+                            with self._lock:
+                                self._source_stats(source)["hedge_wins"] += 1
+                        return attempt.result()
+                    if error is None or attempt is first:
+                        error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+            # Wait for the losers to close their browsers
+            await asyncio.gather(*attempts, return_exceptions=True)
+            if hedge_domain is not None:
+                self._release_hedge(hedge_domain)
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for source, stats in self._stats.items():
+                durations = self._durations.get(source, ())
+                snapshot[source] = dict(stats)
+                snapshot[source]["hedge_after"] = (
+                    percentile(durations, self.pct) if len(durations) >= self.min_samples else None)
+            return {"enabled": self.enabled, "sources": snapshot}
+
+
+scraper_hedger = ScraperHedger()
@@ -0,0 +1,34 @@
+import re
+
+# Identifier types made of digits, written with spaces, dots or dashes at will
+NUMERIC_ID_TYPES = ("SIREN", "SIRET")
+
+
+def normalize_identifier(company_id, id_type):
+    """
+    Canonical (id_type, company_id) of a company, so "552 100 554" and
+    "552100554", or two spellings of a name, are the same company
+    """
+    id_type = (id_type or "").strip().upper()
+    company_id = str(company_id or "").strip()
+    if id_type in NUMERIC_ID_TYPES:
+        company_id = re.sub(r"[\s.\-]", "", company_id)
+    else:
+        company_id = " ".join(company_id.casefold().split())
+    return id_type, company_id
+
+
+def scrape_key(company_id, id_type, sources):
+    """Key of a scrape: the normalized identifier and the set of sources it runs"""
+    id_type, company_id = normalize_identifier(company_id, id_type)
+    return f"{id_type}:{company_id}:{','.join(sorted(sources))}"
+
+
+def siren_of(company_id, id_type):
+    """SIREN of a company identified by SIREN or SIRET, or None (e.g. for a name)"""
+    id_type, company_id = normalize_identifier(company_id, id_type)
+    if id_type == "SIREN" and len(company_id) == 9 and company_id.isdigit():
+        return company_id
+    if id_type == "SIRET" and len(company_id) == 14 and company_id.isdigit():
+        return company_id[:9]
+    return None
@@ -0,0 +1,80 @@
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAIError
+from .cassette import wrap_transport
+from .event_loop import run_on_shared_loop
+from .llm_limiter import llm_rate_limiter
+import httpx
+import os
+import threading
+
+load_dotenv()
+
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+
+_http_client = None
+_openai_client = None
+_client_lock = threading.Lock()
+
+
+async def _observe_rate_limit_headers(response):
+    llm_rate_limiter.observe_headers(response.headers)
+
+
+def get_http_client():
+    """
+    Return the pooled keep-alive HTTP client shared by every LLM call.
+    It must only be used from the shared event loop.
+    """
+    global _http_client, _openai_client
+    with _client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _openai_client = None
+            transport = httpx.AsyncHTTPTransport(
+                http2=LLM_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+            )
+            _http_client = httpx.AsyncClient(
+                transport=wrap_transport(transport),
+                timeout=LLM_HTTP_TIMEOUT,
+                event_hooks={"response": [_observe_rate_limit_headers]},
+            )
+        return _http_client
+
+
+def get_openai_client():
+    """Return the AsyncOpenAI client built on the shared HTTP client"""
+    global _openai_client
+    http_client = get_http_client()
+    with _client_lock:
+        if _openai_client is None:
+            _openai_client = AsyncOpenAI(http_client=http_client)
+        return _openai_client
+
+
+def init_llm_clients():
+    """Create the shared clients once and make openai-agents use them"""
+    from agents import set_default_openai_client
+
+    try:
+        set_default_openai_client(get_openai_client())
+    except OpenAIError as e:
+        print(f"Warning: Shared OpenAI client not initialised: {str(e)}")
+
+
+def close_llm_clients():
+    """Close the shared HTTP client and its pooled connections"""
+    global _http_client, _openai_client
+    with _client_lock:
+        http_client = _http_client
+        _http_client = None
+        _openai_client = None
+    if http_client is not None and not http_client.is_closed:
+        run_on_shared_loop(http_client.aclose())
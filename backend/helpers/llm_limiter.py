@@ -0,0 +1,240 @@
+from collections import deque
+from contextvars import ContextVar
+from dotenv import load_dotenv
+import asyncio
+import os
+import re
+import threading
+import time
+
+load_dotenv()
+
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "150000"))
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "1000"))
+
+# Task the current LLM call belongs to, used to queue callers fairly
+current_task_id = ContextVar("current_task_id", default=None)
+
+WINDOW_SECONDS = 60.0
+POLL_INTERVAL = 0.25
+DEFAULT_RETRY_AFTER = 2.0
+
+
+def estimate_tokens(content):
+    """Rough token estimate for a prompt (about 4 characters per token)"""
+    return len(str(content)) // 4 + LLM_COMPLETION_TOKEN_ESTIMATE
+
+
+def parse_reset_duration(value):
+    """Parse OpenAI reset durations such as '1s', '6m0s' or '20ms' into seconds"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    seconds = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        amount = float(amount)
+        if unit == "ms":
+            seconds += amount / 1000
+        elif unit == "s":
+            seconds += amount
+        elif unit == "m":
+            seconds += amount * 60
+        elif unit == "h":
+            seconds += amount * 3600
+    return seconds if matched else None
+
+
+class LLMReservation:
+    """Budget granted to one LLM call, reconciled with the real usage once known"""
+
+    def __init__(self, limiter, entry):
+        self._limiter = limiter
+        self._entry = entry
+
+    def release(self, actual_tokens=None):
+        if actual_tokens is not None:
+            self._limiter.reconcile(self._entry, actual_tokens)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide requests-per-minute and tokens-per-minute budget for LLM calls.
+    Waiting callers are served round-robin across tasks, so one busy task cannot
+    starve the others, and the budget tightens when the provider reports limits.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self._lock = threading.Lock()
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._provider_requests_limit = None
+        self._provider_tokens_limit = None
+        self._window = deque()
+        self._queues = {}
+        self._order = deque()
+        self._blocked_until = 0.0
+        self._stats = {
+            "granted": 0,
+            "rate_limited": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def _limits(self):
+        requests_limit = self.requests_per_minute
+        tokens_limit = self.tokens_per_minute
+        if self._provider_requests_limit:
+            requests_limit = min(requests_limit, self._provider_requests_limit)
+        if self._provider_tokens_limit:
+            tokens_limit = min(tokens_limit, self._provider_tokens_limit)
+        return requests_limit, tokens_limit
+
+    def _prune(self, now):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window.popleft()
+
+    def _wait_time(self, now, tokens):
+        """Seconds until a call of this size fits in the budget (0 if it fits now)"""
+        self._prune(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        requests_limit, tokens_limit = self._limits()
+        wait = 0.0
+        if len(self._window) >= requests_limit:
+            wait = self._window[len(self._window) - requests_limit][0] + WINDOW_SECONDS - now
+
+        used_tokens = sum(entry[1] for entry in self._window)
+        if self._window and used_tokens + tokens > tokens_limit:
+            # Wait until enough old calls leave the window to fit this one
+            freed = 0
+            for timestamp, entry_tokens in self._window:
+                freed += entry_tokens
+                if used_tokens - freed + tokens <= tokens_limit:
+                    break
+            wait = max(wait, timestamp + WINDOW_SECONDS - now)
+
+        return max(wait, 0.0)
+
+    def _is_next(self, key, ticket):
+        return bool(self._order) and self._order[0] == key and self._queues[key][0] is ticket
+
+    def _dequeue(self, key, ticket):
+        queue = self._queues.get(key)
+        if queue is None or ticket not in queue:
+            return
+        was_head = queue[0] is ticket
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[key]
+            self._order.remove(key)
+        elif was_head and self._order[0] == key:
+            # Give the next task its turn
+            self._order.rotate(-1)
+
+    async def acquire(self, tokens, task_key=None):
+        """Wait for budget for one call of roughly `tokens` tokens"""
+        key = task_key or current_task_id.get() or "default"
+        ticket = object()
+        started = time.monotonic()
+        with self._lock:
+            if key not in self._queues:
+                self._queues[key] = deque()
+                self._order.append(key)
+            self._queues[key].append(ticket)
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    if self._is_next(key, ticket):
+                        wait = self._wait_time(now, tokens)
+                        if wait <= 0:
+                            self._dequeue(key, ticket)
+                            entry = [now, tokens]
+                            self._window.append(entry)
+                            waited = now - started
+                            self._stats["granted"] += 1
+                            self._stats["total_wait"] += waited
+                            self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+                            return LLMReservation(self, entry)
+                    else:
+                        wait = POLL_INTERVAL
+                await asyncio.sleep(min(max(wait, 0.01), POLL_INTERVAL))
+        except BaseException:
+            with self._lock:
+                self._dequeue(key, ticket)
+            raise
+
+    def reconcile(self, entry, actual_tokens):
+        with self._lock:
+            entry[1] = actual_tokens
+
+    def observe_headers(self, headers):
+        """Tighten the budget from x-ratelimit-* response headers"""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            if limit_requests and limit_requests.isdigit():
+                self._provider_requests_limit = int(limit_requests)
+            if limit_tokens and limit_tokens.isdigit():
+                self._provider_tokens_limit = int(limit_tokens)
+
+            for kind in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining is not None and remaining.isdigit() and int(remaining) == 0 and reset:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+
+    def on_rate_limited(self, headers=None):
+        """Pause every caller after a 429, honouring Retry-After when present"""
+        retry_after = None
+        if headers:
+            retry_after = parse_reset_duration(headers.get("retry-after"))
+        self.observe_headers(headers)
+        with self._lock:
+            self._stats["rate_limited"] += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + (retry_after or DEFAULT_RETRY_AFTER))
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            requests_limit, tokens_limit = self._limits()
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "requests_per_minute_limit": requests_limit,
+                "tokens_per_minute_limit": tokens_limit,
+                "requests_in_window": len(self._window),
+                "tokens_in_window": sum(entry[1] for entry in self._window),
+                "waiting": {key: len(queue) for key, queue in self._queues.items()},
+                "blocked_for": max(self._blocked_until - now, 0.0),
+            })
+            return snapshot
+
+
+def rate_limit_headers(error):
+    """Return the response headers of a 429 error, or None if it is not a rate limit error"""
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status_code != 429:
+        return None
+    # browser-use wraps the openai error, which keeps the response, in its own
+    while response is None and error.__cause__ is not None:
+        error = error.__cause__
+        response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    return headers if headers is not None else {}
+
+
+llm_rate_limiter = LLMRateLimiter()
@@ -0,0 +1,232 @@
+from collections import deque
+from config.scrapers import domain_limits_for
+from dotenv import load_dotenv
+import asyncio
+import os
+import re
+import threading
+import time
+
+load_dotenv()
+
+# First pause of a domain after an error or challenge page, doubled on each
+# repeat up to the maximum (seconds)
+DOMAIN_BACKOFF_SECONDS = float(os.getenv("DOMAIN_BACKOFF_SECONDS", "30"))
+DOMAIN_BACKOFF_MAX_SECONDS = float(os.getenv("DOMAIN_BACKOFF_MAX_SECONDS", "600"))
+# Clean agent steps on a domain before its reduced navigation rate is raised one notch
+DOMAIN_RECOVERY_STEPS = int(os.getenv("DOMAIN_RECOVERY_STEPS", "10"))
+# Browser sessions open at once across every domain
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "8"))
+
+# Page titles or URLs of anti-bot challenges
+CHALLENGE_MARKERS = (
+    "captcha", "just a moment", "attention required", "access denied", "are you a robot",
+    "unusual traffic", "/sorry/", "cf-chl", "datadome", "too many requests",
+)
+# Action errors that mean the site refused or dropped us. Status codes must
+# stand alone, so a SIREN or byte count containing the digits does not match.
+ERROR_PATTERN = re.compile(
+    r"net::err_|\b(?:429|503)\b|too many requests|connection refused|connection reset", re.IGNORECASE)
+
+WINDOW_SECONDS = 60.0
+POLL_INTERVAL = 0.25
+
+
+def is_challenge(url, title):
+    text = f"{url or ''} {title or ''}".lower()
+    return any(marker in text for marker in CHALLENGE_MARKERS)
+
+
+def is_site_error(errors):
+    return any(ERROR_PATTERN.search(error) for error in errors)
+
+
+class DomainState:
+    """Limits and counters of one scraped domain"""
+
+    def __init__(self, domain, max_sessions, navigations_per_minute):
+        self.domain = domain
+        self.max_sessions = max_sessions
+        self.max_navigations = navigations_per_minute
+        # Current limits, lowered when the site pushes back (sessions are
+        # raised again by the concurrency controller)
+        self.session_limit = max_sessions
+        self.navigation_limit = navigations_per_minute
+        self.active = 0
+        self.waiting = 0
+        self.navigations = deque()
+        self.paused_until = 0.0
+        self.backoff = DOMAIN_BACKOFF_SECONDS
+        self.clean_steps = 0
+        self.stats = {"sessions": 0, "navigations": 0, "challenges": 0, "errors": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+
+class DomainLimiter:
+    """
+    Per-domain cap on open browser sessions and page navigations per minute,
+    under a global cap on browser sessions, shared by every task in the
+    process. ScrapingAgent holds a session for the whole run and takes a
+    navigation before each agent step. Errors and challenge pages halve the
+    domain's limits and pause it with an exponential backoff; clean steps
+    raise the navigation rate back one notch at a time.
+    """
+
+    def __init__(self, pool_size=BROWSER_POOL_SIZE):
+        self._lock = threading.Lock()
+        self._domains = {}
+        self.max_pool_size = pool_size
+        self.pool_size = pool_size
+        self.pool_active = 0
+
+    def _state(self, source):
+        limits = domain_limits_for(source) if source else None
+        if limits is None:
+            return None
+        with self._lock:
+            state = self._domains.get(limits["domain"])
+            if state is None:
+                state = self._domains[limits["domain"]] = DomainState(
+                    limits["domain"], limits["max_sessions"], limits["navigations_per_minute"])
+            return state
+
+    def domain_for(self, source):
+        state = self._state(source)
+        return state.domain if state is not None else None
+
+    async def acquire_session(self, source, timeout=None):
+        """Wait for a free session on the source's domain; False if none was free within `timeout`"""
+        state = self._state(source)
+        if state is None:
+            return True
+        started = time.monotonic()
+        with self._lock:
+            state.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    if (state.active < state.session_limit and self.pool_active < self.pool_size
+                            and now >= state.paused_until):
+                        state.active += 1
+                        self.pool_active += 1
+                        waited = now - started
+                        state.stats["sessions"] += 1
+                        state.stats["total_wait"] += waited
+                        state.stats["max_wait"] = max(state.stats["max_wait"], waited)
+                        return True
+                if timeout is not None and now - started >= timeout:
+                    return False
+                await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            with self._lock:
+                state.waiting -= 1
+
+    def release_session(self, source):
+        state = self._state(source)
+        if state is None:
+            return
+        with self._lock:
+            state.active = max(state.active - 1, 0)
+            self.pool_active = max(self.pool_active - 1, 0)
+
+    async def navigate(self, source):
+        """Wait until the source's domain may load another page"""
+        state = self._state(source)
+        if state is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while state.navigations and now - state.navigations[0] >= WINDOW_SECONDS:
+                    state.navigations.popleft()
+                if now < state.paused_until:
+                    wait = state.paused_until - now
+                elif len(state.navigations) < state.navigation_limit:
+                    state.navigations.append(now)
+                    state.stats["navigations"] += 1
+                    return
+                else:
+                    wait = state.navigations[0] + WINDOW_SECONDS - now
+            await asyncio.sleep(min(max(wait, 0.01), POLL_INTERVAL))
+
+    def observe_step(self, source, url=None, title=None, errors=()):
+        """Adapt the domain's limits to what one agent step ran into"""
+        state = self._state(source)
+        if state is None:
+            return
+        if is_challenge(url, title):
+            self._back_off(state, "challenges", f"challenge page at {url}")
+        elif is_site_error(errors):
+            self._back_off(state, "errors", errors[0])
+        else:
+            self._recover(state)
+
+    def _back_off(self, state, counter, reason):
+        with self._lock:
+            state.stats[counter] += 1
+            state.session_limit = max(1, state.session_limit // 2)
+            state.navigation_limit = max(1.0, state.navigation_limit / 2)
+            state.paused_until = max(state.paused_until, time.monotonic() + state.backoff)
+            pause = state.backoff
+            state.backoff = min(state.backoff * 2, DOMAIN_BACKOFF_MAX_SECONDS)
+            state.clean_steps = 0
+        print(f"Warning: Backing off {state.domain} for {pause:.0f}s ({reason})")
+
+    def _recover(self, state):
+        with self._lock:
+            state.clean_steps += 1
+            if state.clean_steps < DOMAIN_RECOVERY_STEPS:
+                return
+            state.clean_steps = 0
+            state.navigation_limit = min(state.max_navigations,
+                                         state.navigation_limit + max(1.0, state.max_navigations / 4))
+            if state.navigation_limit == state.max_navigations:
+                state.backoff = DOMAIN_BACKOFF_SECONDS
+
+    def session_limits(self, source):
+        """(current, configured) session limit of the source's domain, or None without a browser"""
+        state = self._state(source)
+        if state is None:
+            return None
+        with self._lock:
+            return state.session_limit, state.max_sessions
+
+    def set_session_limit(self, source, limit):
+        state = self._state(source)
+        if state is None:
+            return
+        with self._lock:
+            state.session_limit = max(1, min(state.max_sessions, limit))
+
+    def set_pool_size(self, size):
+        with self._lock:
+            self.pool_size = max(1, min(self.max_pool_size, size))
+
+    def pool_snapshot(self):
+        with self._lock:
+            return {
+                "size": self.pool_size,
+                "max_size": self.max_pool_size,
+                "active": self.pool_active,
+                "waiting": sum(state.waiting for state in self._domains.values()),
+            }
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            snapshot = {}
+            for domain, state in self._domains.items():
+                snapshot[domain] = dict(state.stats)
+                snapshot[domain].update({
+                    "active_sessions": state.active,
+                    "waiting_sessions": state.waiting,
+                    "session_limit": state.session_limit,
+                    "max_sessions": state.max_sessions,
+                    "navigations_in_window": sum(1 for at in state.navigations if now - at < WINDOW_SECONDS),
+                    "navigations_per_minute_limit": state.navigation_limit,
+                    "paused_for": max(state.paused_until - now, 0.0),
+                })
+            return snapshot
+
+
+domain_limiter = DomainLimiter()
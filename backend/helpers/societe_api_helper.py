@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 import requests
+from .cassette import cassette_call
 
 load_dotenv()
 
@@ -8,6 +9,7 @@ soc_api_url = "https://api.societe.com/api/v1/entreprise/search?nom={name}&nbrep
 token = os.getenv('SOC_API_TOKEN')
 
 
+@cassette_call("societe_api")
 def get_companies_from_societe_api(company_name, nbrep=5):
     # Format the URL with the company name and token
     url = soc_api_url.format(name=company_name, nbrep=nbrep, token=token)
@@ -0,0 +1,169 @@
+from collections import deque
+from dotenv import load_dotenv
+import os
+import threading
+import time
+
+load_dotenv()
+
+# Task pipelines run at the same time by one API process (each holds a browser while scraping)
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "8"))
+
+# Priority classes, most urgent first. `share` is the fraction of the workers
+# a class may occupy at once; interactive requests may use all of them, bulk
+# (batch) work only part, so a free worker soon opens up for the UI.
+PRIORITY_CLASSES = {
+    "interactive": {"share": float(os.getenv("TASK_SHARE_INTERACTIVE", "1.0"))},
+    "bulk": {"share": float(os.getenv("TASK_SHARE_BULK", "0.5"))},
+}
+
+
+class TaskPreempted(Exception):
+    """Raised at a scraper boundary when a bulk job gives its worker to interactive work"""
+
+
+class Job:
+    def __init__(self, fn, args, priority):
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class WorkerPool:
+    """
+    Fixed set of daemon threads running task pipelines, with a queue per
+    priority class. A free worker takes the oldest job of the most urgent
+    class still under its share of the workers. Bulk jobs check
+    preempt_requested() between scrapers and give their worker back while
+    interactive jobs are waiting and no worker is free.
+    Daemon threads, unlike ThreadPoolExecutor's, never hold up shutdown
+    behind a stuck browser session.
+    """
+
+    def __init__(self, size=TASK_WORKERS, classes=PRIORITY_CLASSES):
+        self.size = size
+        self.classes = classes
+        self._condition = threading.Condition()
+        self._queues = {name: deque() for name in classes}
+        self._active = {name: 0 for name in classes}
+        self._stats = {name: {"dispatched": 0, "total_wait": 0.0, "max_wait": 0.0, "preempted": 0} for name in classes}
+        self._threads = []
+        self._local = threading.local()
+
+    def limit(self, priority):
+        """Most workers a class may occupy at once"""
+        return max(1, int(self.size * self.classes[priority]["share"]))
+
+    def _start(self):
+        while len(self._threads) < self.size:
+            thread = threading.Thread(
+                target=self._work, name=f"task-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        for name in self.classes:
+            if self._queues[name] and self._active[name] < self.limit(name):
+                return self._queues[name].popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                self._active[job.priority] += 1
+                waited = time.monotonic() - job.enqueued_at
+                stats = self._stats[job.priority]
+                stats["dispatched"] += 1
+                stats["total_wait"] += waited
+                stats["max_wait"] = max(stats["max_wait"], waited)
+
+            self._local.job = job
+            try:
+                job.fn(*job.args)
+            except Exception as e:
+                print(f"Warning: Task worker failed: {str(e)}")
+            finally:
+                self._local.job = None
+                with self._condition:
+                    self._active[job.priority] -= 1
+                    self._condition.notify_all()
+
+    def submit(self, fn, *args, priority="interactive", front=False):
+        """Queue `fn(*args)` in a priority class (`front` puts it ahead of the class's queue)"""
+        if priority not in self.classes:
+            raise ValueError(f"Unknown priority class '{priority}', expected one of: {', '.join(self.classes)}")
+        job = Job(fn, args, priority)
+        with self._condition:
+            self._start()
+            if front:
+                self._queues[priority].appendleft(job)
+            else:
+                self._queues[priority].append(job)
+            self._condition.notify_all()
+
+    def promote(self, match, priority):
+        """
+        Move the first job queued in a less urgent class for which
+        `match(*args)` is true to the back of `priority`'s queue, keeping its
+        enqueue time. Returns whether a job was moved.
+        """
+        names = list(self.classes)
+        with self._condition:
+            for name in names[names.index(priority) + 1:]:
+                for job in self._queues[name]:
+                    if match(*job.args):
+                        self._queues[name].remove(job)
+                        job.priority = priority
+                        self._queues[priority].append(job)
+                        self._condition.notify_all()
+                        return True
+        return False
+
+    def current_priority(self):
+        """Priority class of the job running on this thread, or None outside the pool"""
+        job = getattr(self._local, "job", None)
+        return job.priority if job is not None else None
+
+    def preempt_requested(self):
+        """Whether the job on this thread should yield its worker to more urgent queued work"""
+        priority = self.current_priority()
+        if priority is None:
+            return False
+        with self._condition:
+            if sum(self._active.values()) < self.size:
+                # A worker is free and will take the queued job without our help
+                return False
+            for name in self.classes:
+                if name == priority:
+                    return False
+                if self._queues[name] and self._active[name] < self.limit(name):
+                    self._stats[priority]["preempted"] += 1
+                    return True
+        return False
+
+    def snapshot(self):
+        """Workers in use and queue length per class, with the time jobs waited to start"""
+        with self._condition:
+            classes = {}
+            for name in self.classes:
+                stats = self._stats[name]
+                queued = self._queues[name]
+                classes[name] = {
+                    "limit": self.limit(name),
+                    "active": self._active[name],
+                    "queued": len(queued),
+                    "oldest_queued_wait": time.monotonic() - queued[0].enqueued_at if queued else 0.0,
+                    "dispatched": stats["dispatched"],
+                    "avg_wait": stats["total_wait"] / stats["dispatched"] if stats["dispatched"] else 0.0,
+                    "max_wait": stats["max_wait"],
+                    "preempted": stats["preempted"],
+                }
+            return {"size": self.size, "active": sum(self._active.values()), "classes": classes}
+
+
+worker_pool = WorkerPool()
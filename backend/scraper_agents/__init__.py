@@ -1,3 +1,3 @@
-from .scraping_agent import ScrapingAgent
+from .scraping_agent import ScrapingAgent, ScraperTimeout, BrowserCapacityTimeout
 from .ellisphere_agent import EllisphereAgent
 from .compiler_agent import OpenAICompiler
@@ -1,5 +1,6 @@
-from agents import Agent, Runner, ModelSettings
+from agents import Agent, ModelSettings
 from dotenv import load_dotenv
+from config.model import model_for, run_agent
 
 load_dotenv()
 
@@ -114,7 +115,7 @@ class OpenAICompiler:
         self.agent = Agent(
             name="Translator and Compiler Agent",
             instructions=openai_compiler_instruction,
-            model="gpt-4o",
+            model=model_for("compilation"),
             model_settings=ModelSettings(
                 max_tokens=30000,
                 truncation="disabled",
@@ -122,5 +123,5 @@ class OpenAICompiler:
         )
 
     async def run(self, to_compile):
-        result = await Runner.run(self.agent, to_compile)
+        result = await run_agent(self.agent, to_compile, "compilation")
         return result.final_output
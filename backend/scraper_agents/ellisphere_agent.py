@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
-from agents import Agent, Runner, ModelSettings
+from agents import Agent, ModelSettings
+from config.model import model_for, run_agent
 
 load_dotenv()
 
@@ -147,14 +148,14 @@ class EllisphereAgent:
         self.xml_parser_agent = Agent(
             name="Ellisphere XML Parser",
             instructions=xml_parser_instructions,
-            model="gpt-4o",
+            model=model_for("xml_parsing"),
         )
 
         # Compiler Agent
         self.compiler_agent = Agent(
             name="Ellisphere Translator And Compiler Agent",
             instructions=compiler_instructions,
-            model="gpt-4o",
+            model=model_for("compilation"),
             model_settings=ModelSettings(
                 max_tokens=30000,
                 truncation="disabled",
@@ -165,7 +166,7 @@ class EllisphereAgent:
         """
         Parse XML content and return structured JSON data.
         """
-        result = await Runner.run(self.xml_parser_agent, xml_content)
+        result = await run_agent(self.xml_parser_agent, xml_content, "xml_parsing")
         final_output = result.final_output
 
         # Fix encoding issues in the final_output string
@@ -177,7 +178,7 @@ class EllisphereAgent:
         """
         Parse XML content and translate to French.
         """
-        result = await Runner.run(self.xml_parser_agent, xml_content)
+        result = await run_agent(self.xml_parser_agent, xml_content, "xml_parsing")
         final_output = result.final_output
 
         # Fix encoding issues in the final_output string
@@ -189,7 +190,7 @@ class EllisphereAgent:
         """
         Compile data from multiple sources and translate to French.
         """
-        result = await Runner.run(self.compiler_agent, data_from_multiple_sources)
+        result = await run_agent(self.compiler_agent, data_from_multiple_sources, "compilation")
         final_output = result.final_output
 
         # Fix encoding issues in the final_output string
@@ -1,23 +1,117 @@
-from config.model import llm
-from browser_use import Agent, BrowserSession
+from config.model import RoutedChatModel
+from browser_use import Agent
+from helpers.cassette import cassette_call
+from helpers.browser_sessions import browser_lifecycle
+from helpers.browser_profiles import browser_profiles
+from helpers.site_limiter import domain_limiter
+from helpers.browser_memory import browser_memory, BrowserMemoryExceeded
+from helpers.adaptive_concurrency import concurrency_controller
+import asyncio
+import time
+
+
+class ScraperTimeout(Exception):
+    """Raised when a scraper runs out of time or steps, with the output gathered so far"""
+
+    def __init__(self, message, partial_result=None):
+        super().__init__(message)
+        self.partial_result = partial_result
+
+
+class BrowserCapacityTimeout(ScraperTimeout):
+    """Raised when this host had no browser session or memory free in time, which says nothing about the site"""
+
+
+def partial_result(history):
+    """Join what the agent extracted before it was stopped, or None if nothing"""
+    extracted = [content for content in history.extracted_content() if content]
+    return "\n\n".join(extracted) if extracted else None
 
 
 class ScrapingAgent:
-    def __init__(self, task):
+    def __init__(self, task, workload="browser_navigation", timeout=None, max_steps=None, source=None):
         self.task = task
+        self.workload = workload
+        self.timeout = timeout
+        self.max_steps = max_steps
+        # Source whose domain limits the browser session must respect
+        self.source = source
 
+    async def _before_step(self, agent):
+        await domain_limiter.navigate(self.source)
+
+    async def _after_step(self, agent):
+        if agent.history.history:
+            step = agent.history.history[-1]
+            errors = [result.error for result in step.result if result.error]
+            domain_limiter.observe_step(self.source, step.state.url, step.state.title, errors)
+
+    @cassette_call("browser_scrape", key=lambda self, company_id, id_type: (self.task, company_id, id_type))
     async def scrape(self, company_id, id_type):
-        browser_session = BrowserSession(
-            headless=False,
-        )
-
-        agent = Agent(
-            task=self.task,
-            llm=llm,
-            browser_session=browser_session,
-        )
-
-        history = await agent.run()
-        await browser_session.close()
+        started = time.monotonic()
+        if not await domain_limiter.acquire_session(self.source, self.timeout):
+            raise BrowserCapacityTimeout(f"No browser session free on {domain_limiter.domain_for(self.source)} "
+                                         f"within {self.timeout:.0f}s")
+        entry = None
+        try:
+            entry = await browser_memory.admit(
+                self.source, self.timeout - (time.monotonic() - started) if self.timeout else None)
+            if entry is None:
+                raise BrowserCapacityTimeout(f"Not enough memory to start a browser within {self.timeout:.0f}s")
+            return await self._timed_scrape(self.timeout - (time.monotonic() - started) if self.timeout else None, entry)
+        finally:
+            if entry is not None:
+                browser_memory.release(entry)
+            domain_limiter.release_session(self.source)
+
+    async def _timed_scrape(self, timeout, entry):
+        """
+        Run the browser and report how long it ran, and whether the site gave
+        a result, to the concurrency controller. The wait for a session and
+        memory is left out, so queueing here never reads as the site slowing down.
+        """
+        started = time.monotonic()
+        try:
+            result = await self._scrape(timeout, entry)
+        except BrowserMemoryExceeded:
+            # Stopped by our own memory cap, which says nothing about the site
+            raise
+        except ScraperTimeout as e:
+            concurrency_controller.record(self.source, time.monotonic() - started, ok=e.partial_result is not None)
+            raise
+        except Exception:
+            concurrency_controller.record(self.source, time.monotonic() - started, ok=False)
+            raise
+        concurrency_controller.record(self.source, time.monotonic() - started, ok=True)
+        return result
+
+    async def _scrape(self, timeout, entry):
+        # The session and its Chromium processes are closed however the block exits,
+        # including when the task is cancelled, before its profile is released
+        async with browser_profiles.lease(self.source) as profile, \
+                browser_lifecycle.session(headless=False, **profile) as browser_session:
+            agent = Agent(
+                task=self.task,
+                llm=RoutedChatModel(self.workload),
+                browser_session=browser_session,
+            )
+
+            run_options = {"on_step_start": self._before_step, "on_step_end": self._after_step}
+            if self.max_steps:
+                run_options["max_steps"] = self.max_steps
+            # Run in its own task, so the memory guard can stop it without cancelling the scrape
+            run_task = asyncio.ensure_future(agent.run(**run_options))
+            entry.attach(browser_session, run_task)
+            try:
+                history = await asyncio.wait_for(run_task, timeout=timeout)
+            except asyncio.TimeoutError:
+                raise ScraperTimeout(f"Timed out after {self.timeout:.0f}s", partial_result(agent.history))
+            except asyncio.CancelledError:
+                if entry.killed:
+                    raise BrowserMemoryExceeded(
+                        f"Browser killed after using {entry.peak / 1024 / 1024:.0f} MB", partial_result(agent.history))
+                raise
+        if self.max_steps and not history.is_done() and history.number_of_steps() >= self.max_steps:
+            raise ScraperTimeout(f"Stopped after {self.max_steps} steps", partial_result(history))
         result = history.final_result()
         return result
@@ -0,0 +1,6 @@
+from .base import TaskStateBackend, FINISHED_STATUSES, worker_id
+from .snapshot import TaskSnapshot, TASK_FIELDS
+from .task_store import TaskStore
+from .sqlite_backend import SQLiteTaskBackend
+from .backends import create_task_backend
+from .source_cache import SourceCache
@@ -0,0 +1,21 @@
+from dotenv import load_dotenv
+from .task_store import TaskStore
+from .sqlite_backend import SQLiteTaskBackend
+import os
+
+load_dotenv()
+
+# "memory" (single process, default) or "sqlite" (shared by several workers/nodes)
+TASK_STATE_BACKEND = os.getenv("TASK_STATE_BACKEND", "memory").lower()
+
+TASK_BACKENDS = {
+    TaskStore.name: TaskStore,
+    SQLiteTaskBackend.name: SQLiteTaskBackend,
+}
+
+
+def create_task_backend(name=TASK_STATE_BACKEND):
+    """Build the task state backend selected by TASK_STATE_BACKEND"""
+    if name not in TASK_BACKENDS:
+        raise ValueError(f"Unknown task state backend '{name}', expected one of: {', '.join(TASK_BACKENDS)}")
+    return TASK_BACKENDS[name]()
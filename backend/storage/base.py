@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import re
+import socket
+import time
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Finished statuses a task can be reopened from to run again
+REOPENABLE_STATUSES = ("failed", "cancelled")
+
+# Result keys SQLite can extract by JSON path, and how many fit in one json_object() call
+SIMPLE_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+MAX_EXTRACTED_KEYS = 63
+
+
+def worker_id():
+    """Identifies this API process among the workers sharing a task backend"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def load_task_data(db, task_id, keys=None):
+    """
+    Read a task's results from the `data` column, only decoding the given keys
+    when `keys` is set (SQLite extracts them without parsing the whole blob)
+    """
+    if keys is None:
+        row = db.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+    if not keys:
+        return {}
+    if len(keys) > MAX_EXTRACTED_KEYS or not all(SIMPLE_KEY.fullmatch(key) for key in keys):
+        # SQLite JSON paths cannot quote every key, and json_object() takes at
+        # most 127 arguments: decode the blob in Python instead
+        data = load_task_data(db, task_id)
+        return {key: data.get(key) for key in keys} if data is not None else None
+    arguments = []
+    for key in keys:
+        arguments += [key, f"$.{key}"]
+    pairs = ", ".join("?, json_extract(data, ?)" for _ in keys)
+    row = db.execute(f"SELECT json_object({pairs}) FROM tasks WHERE task_id = ? AND data IS NOT NULL",
+                     (*arguments, task_id)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+# Batches of tasks, stored next to the tasks by both SQLite-based backends
+BATCHES_TABLE = """
+    CREATE TABLE IF NOT EXISTS batches (
+        batch_id TEXT PRIMARY KEY,
+        items TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+"""
+
+
+def add_missing_columns(db, columns):
+    """Add columns created by later versions to an existing tasks table"""
+    existing = [row[1] for row in db.execute("PRAGMA table_info(tasks)")]
+    for name, definition in columns.items():
+        if name not in existing:
+            db.execute(f"ALTER TABLE tasks ADD COLUMN {name} {definition}")
+
+
+class TaskStateBackend:
+    """
+    Interface of the task state backends. Records are returned in the API
+    shape: status and version plus progress, scraper_statuses, error and data
+    when set. The version grows by one with every update of a task, and
+    backends track the version at which each field (and each key of data)
+    last changed so records can be limited to a delta. Updates to a
+    cancelled task are ignored.
+    """
+
+    name = "base"
+    # Seconds between re-reads while waiting for a change, for backends that
+    # can be updated by other processes (None means local notifications suffice)
+    watch_poll_interval = None
+
+    def create(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        raise NotImplementedError
+
+    def create_or_attach(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        """
+        Register a new task unless an unfinished task has the same scrape key.
+        Returns (task_id, created): the new task's id, or the running one's.
+        """
+        raise NotImplementedError
+
+    def update(self, task_id, status, data=None, error=None, progress=None, scraper_statuses=None):
+        raise NotImplementedError
+
+    def reopen(self, task_id):
+        """
+        Move a failed or cancelled task back to pending so it can run again,
+        keeping its results as checkpoints. Returns the new snapshot, or None
+        if the task is unknown, not failed or cancelled, or its pipeline is
+        still stopping on another worker.
+        """
+        raise NotImplementedError
+
+    def release(self, task_id):
+        """Record that this process's pipeline of the task stopped"""
+
+    def get(self, task_id, fields=None, since_version=None):
+        """
+        Return the task record, or None if unknown. `fields` limits it to some
+        of TASK_FIELDS; `since_version` to what changed after that version.
+        """
+        raise NotImplementedError
+
+    def get_snapshot(self, task_id):
+        """Return the current TaskSnapshot (without results), or None if unknown"""
+        raise NotImplementedError
+
+    def get_snapshots(self, task_ids):
+        """Return {task_id: TaskSnapshot, or None if unknown} for several tasks"""
+        return {task_id: self.get_snapshot(task_id) for task_id in task_ids}
+
+    async def _read(self, function, *args):
+        """Call a read from a waiter, in a thread for backends other processes write to (and lock)"""
+        if self.watch_poll_interval is None:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    async def wait_for_changes(self, versions, timeout):
+        """
+        Wait until any task of `versions` ({task_id: version}) moves past its
+        version or the timeout expires, then return {task_id: snapshot} for
+        the tasks that changed (empty on timeout). A single waiter and, for
+        backends polling for other processes, a single read per poll cover
+        all of the tasks.
+        """
+        deadline = time.monotonic() + timeout
+        task_ids = list(versions)
+        while True:
+            waiter = self.watchers.add_many(task_ids)
+            try:
+                # Re-check after registering so an update in between is not missed
+                snapshots = await self._read(self.get_snapshots, task_ids)
+                changed = {
+                    task_id: snapshot for task_id, snapshot in snapshots.items()
+                    if snapshot is None or snapshot.version != versions[task_id]
+                }
+                remaining = deadline - time.monotonic()
+                if changed or remaining <= 0:
+                    return changed
+                if self.watch_poll_interval is not None:
+                    remaining = min(remaining, self.watch_poll_interval)
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                self.watchers.remove_many(task_ids, waiter)
+
+    async def wait_for_change(self, task_id, version, timeout):
+        """
+        Wait until the task's version differs from `version` or the timeout
+        expires, then return its current snapshot (None if the task is unknown)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            waiter = self.watchers.add(task_id)
+            try:
+                # Re-check after registering so an update in between is not missed
+                snapshot = await self._read(self.get_snapshot, task_id)
+                remaining = deadline - time.monotonic()
+                if snapshot is None or snapshot.version != version or remaining <= 0:
+                    return snapshot
+                if self.watch_poll_interval is not None:
+                    remaining = min(remaining, self.watch_poll_interval)
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                self.watchers.remove(task_id, waiter)
+
+    def create_batch(self, batch_id, items):
+        """Record a batch as its list of {company_id, id_type, task_id} items"""
+        self._connection().execute(
+            "INSERT INTO batches (batch_id, items, created_at) VALUES (?, ?, ?)",
+            (batch_id, json.dumps(items, ensure_ascii=False), time.time()))
+
+    def get_batch(self, batch_id):
+        """Return the items of a batch, or None if unknown"""
+        row = self._connection().execute("SELECT items FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_priority(self, task_id, priority):
+        """Change the priority class a task is restarted in after a crash"""
+        self._connection().execute("UPDATE tasks SET priority = ? WHERE task_id = ?", (priority, task_id))
+
+    def claim_unfinished(self):
+        """
+        Take ownership of pending or running tasks left behind by a dead process
+        and return them as (task_id, company_id, id_type, priority)
+        """
+        raise NotImplementedError
+
+    def watch_orphans(self, callback):
+        """Call `callback(task_id, company_id, id_type, priority)` for tasks orphaned while running"""
+
+    def evict_expired(self, force=False):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadConnections:
+    """
+    One autocommit connection to a SQLite file per thread, since sqlite3
+    connections are not shared between threads. Writers wait up to 30s for
+    a lock held by another connection or process.
+    """
+
+    def __init__(self, db_path, pragmas=()):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA busy_timeout = 30000")
+            for pragma in self.pragmas:
+                db.execute(f"PRAGMA {pragma}")
+            self._local.db = db
+        return db
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+import copy
+import hashlib
+import json
+import time
+
+# Fields of a task record a client can select
+TASK_FIELDS = ("status", "progress", "scraper_statuses", "error", "data")
+
+
+def check_fields(fields):
+    """Raise ValueError if `fields` names anything but TASK_FIELDS"""
+    unknown = [name for name in fields or () if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+# Columns read by TaskSnapshot.from_row, in order
+SNAPSHOT_COLUMNS = ("status, version, progress, scraper_statuses, error, company_id, id_type, created_at, "
+                    "updated_at, data IS NOT NULL, field_versions")
+
+
+def _digest(value):
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class TaskSnapshot:
+    """
+    Immutable view of a task at one version. Updates build a new snapshot
+    and swap it in, so a reader holding a snapshot never sees a half-applied
+    change and never needs a lock.
+    """
+
+    task_id: str
+    status: str
+    version: int = 0
+    progress: float = None
+    scraper_statuses: MappingProxyType = None
+    error: str = None
+    company_id: str = None
+    id_type: str = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    has_data: bool = False
+    # Version at which each field last changed, and for each key of the
+    # results, the version at which it last changed and a digest of its value
+    field_versions: MappingProxyType = None
+    data_versions: MappingProxyType = None
+
+    @classmethod
+    def from_row(cls, task_id, row):
+        """Build a snapshot from a row of SNAPSHOT_COLUMNS"""
+        versions = json.loads(row[10]) if row[10] else {}
+        return cls(
+            task_id=task_id,
+            status=row[0],
+            version=row[1],
+            progress=row[2],
+            scraper_statuses=MappingProxyType(json.loads(row[3])) if row[3] else None,
+            error=row[4],
+            company_id=row[5],
+            id_type=row[6],
+            created_at=row[7],
+            updated_at=row[8],
+            has_data=bool(row[9]),
+            field_versions=MappingProxyType(versions["fields"]) if "fields" in versions else None,
+            data_versions=MappingProxyType(versions["data"]) if "data" in versions else None,
+        )
+
+    def versions_json(self):
+        """Serialise the change versions for the field_versions column"""
+        versions = {}
+        if self.field_versions is not None:
+            versions["fields"] = dict(self.field_versions)
+        if self.data_versions is not None:
+            versions["data"] = dict(self.data_versions)
+        return json.dumps(versions)
+
+    def updated(self, status, error=None, progress=None, scraper_statuses=None, data=None):
+        """Return the next version of this snapshot with the given changes applied"""
+        version = self.version + 1
+        field_versions = dict(self.field_versions or {})
+        changes = {
+            "status": status,
+            "version": version,
+            "updated_at": time.time(),
+        }
+        if error is not None:
+            changes["error"] = error
+        if progress is not None:
+            changes["progress"] = progress
+        if scraper_statuses is not None:
+            # Copy so later changes to the caller's dict cannot leak into this version
+            changes["scraper_statuses"] = MappingProxyType(copy.deepcopy(dict(scraper_statuses)))
+        for name, value in changes.items():
+            if name in TASK_FIELDS and getattr(self, name) != value:
+                field_versions[name] = version
+
+        if data is not None:
+            changes["has_data"] = True
+            previous = self.data_versions or {}
+            data_versions = {}
+            for key, value in data.items():
+                digest = _digest(value)
+                if key in previous and previous[key][1] == digest:
+                    data_versions[key] = previous[key]
+                else:
+                    data_versions[key] = (version, digest)
+                    field_versions["data"] = version
+            changes["data_versions"] = MappingProxyType(data_versions)
+
+        changes["field_versions"] = MappingProxyType(field_versions)
+        return replace(self, **changes)
+
+    def reopened(self):
+        """Return the next version of this snapshot, back to pending with the error cleared"""
+        version = self.version + 1
+        field_versions = dict(self.field_versions or {})
+        field_versions["status"] = version
+        field_versions["error"] = version
+        return replace(self, status="pending", error=None, version=version, updated_at=time.time(),
+                       field_versions=MappingProxyType(field_versions))
+
+    def changed_since(self, name, since_version):
+        """Whether a field changed after `since_version` (always true without a version)"""
+        if since_version is None:
+            return True
+        # Tasks stored before versions were tracked count as changed
+        return (self.field_versions or {}).get(name, self.version) > since_version
+
+    def data_keys(self, since_version=None):
+        """Keys of the results that changed after `since_version`, or None for all of them"""
+        if since_version is None or self.data_versions is None:
+            return None
+        return [key for key, (version, _) in self.data_versions.items() if version > since_version]
+
+    def to_record(self, data=None, fields=None, since_version=None):
+        """
+        Return the task in the API shape, limited to `fields` if given and, with
+        `since_version`, to the fields that changed after that version
+        """
+        record = {"version": self.version}
+        if since_version is not None:
+            record["since_version"] = since_version
+        for name in ("status", "progress", "scraper_statuses", "error"):
+            value = getattr(self, name)
+            if value is None or (fields is not None and name not in fields):
+                continue
+            if not self.changed_since(name, since_version):
+                continue
+            record[name] = dict(value) if name == "scraper_statuses" else value
+        if data is not None and (fields is None or "data" in fields):
+            record["data"] = data
+        return record
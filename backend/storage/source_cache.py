@@ -0,0 +1,113 @@
+from dotenv import load_dotenv
+from .connections import ThreadConnections
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+
+SOURCE_CACHE_PATH = os.getenv("SOURCE_CACHE_PATH", "data/source-cache.db")
+
+# How long a scraped result stays fresh, per source (seconds). Registry data
+# changes rarely; the Google search and Ellisphere reports are kept shorter.
+SOURCE_CACHE_TTLS = {
+    "infogreffe": float(os.getenv("SOURCE_CACHE_TTL_INFOGREFFE", "604800")),
+    "pappers": float(os.getenv("SOURCE_CACHE_TTL_PAPPERS", "604800")),
+    "societe": float(os.getenv("SOURCE_CACHE_TTL_SOCIETE", "604800")),
+    "ellisphere": float(os.getenv("SOURCE_CACHE_TTL_ELLISPHERE", "86400")),
+    "google": float(os.getenv("SOURCE_CACHE_TTL_GOOGLE", "86400")),
+}
+
+# Expired entries are kept this much longer (seconds), served only while the
+# source itself is unavailable
+SOURCE_CACHE_STALE_SECONDS = float(os.getenv("SOURCE_CACHE_STALE_SECONDS", "2592000"))
+
+SWEEP_INTERVAL = 3600
+
+
+class SourceCache:
+    """
+    Persistent cache of each source's result per company, keyed by
+    (source, SIREN). Entries older than the source's TTL, or than the
+    `max_age` a request asks for, are treated as missing and re-scraped, but
+    kept for a grace period as a stale fallback for when the source is down.
+    Stored in its own SQLite file (WAL), shared by every worker.
+    """
+
+    def __init__(self, db_path=SOURCE_CACHE_PATH, ttls=SOURCE_CACHE_TTLS, stale_for=SOURCE_CACHE_STALE_SECONDS):
+        self.db_path = db_path
+        self.ttls = ttls
+        self.stale_for = stale_for
+        self._connections = ThreadConnections(db_path)
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0}
+        self._last_sweep = 0.0
+
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS source_cache (
+                source TEXT NOT NULL,
+                siren TEXT NOT NULL,
+                result TEXT NOT NULL,
+                cached_at REAL NOT NULL,
+                PRIMARY KEY (source, siren)
+            )
+        """)
+
+    def _connection(self):
+        return self._connections.get()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def max_age_for(self, source, max_age=None):
+        """Oldest acceptable entry for a source: its TTL, lowered by the request's max_age"""
+        ttl = self.ttls.get(source, 0)
+        return ttl if max_age is None else min(ttl, max_age)
+
+    def get(self, source, siren, max_age=None, stale=False):
+        """
+        Return (result, age in seconds) if a fresh entry exists, otherwise None.
+        With `stale`, any entry still kept is returned, whatever its age; that
+        fallback follows a fresh lookup which already counted the miss.
+        """
+        if siren is None:
+            return None
+        limit = self.ttls.get(source, 0) + self.stale_for if stale else self.max_age_for(source, max_age)
+        row = self._connection().execute(
+            "SELECT result, cached_at FROM source_cache WHERE source = ? AND siren = ?",
+            (source, siren)).fetchone()
+        age = time.time() - row[1] if row else None
+        if row is None or limit <= 0 or age > limit:
+            if not stale:
+                self._count("misses")
+            return None
+        self._count("stale_hits" if stale else "hits")
+        return json.loads(row[0]), age
+
+    def put(self, source, siren, result):
+        if siren is None or self.ttls.get(source, 0) <= 0:
+            return
+        self._connection().execute(
+            "INSERT OR REPLACE INTO source_cache (source, siren, result, cached_at) VALUES (?, ?, ?, ?)",
+            (source, siren, json.dumps(result, ensure_ascii=False, default=str), time.time()))
+        self._count("stores")
+        self.evict_expired()
+
+    def evict_expired(self, force=False):
+        """Delete entries past their source's TTL and grace period (at most once per sweep interval)"""
+        now = time.time()
+        if not force and now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        db = self._connection()
+        for source, ttl in self.ttls.items():
+            db.execute("DELETE FROM source_cache WHERE source = ? AND cached_at < ?", (source, now - ttl - self.stale_for))
+
+    def stats(self):
+        entries = self._connection().execute("SELECT COUNT(*) FROM source_cache").fetchone()[0]
+        with self._stats_lock:
+            return dict(self._stats, entries=entries)
@@ -0,0 +1,284 @@
+from dotenv import load_dotenv
+from .base import TaskStateBackend, FINISHED_STATUSES, REOPENABLE_STATUSES, BATCHES_TABLE, worker_id, load_task_data, add_missing_columns
+from .connections import ThreadConnections
+from .snapshot import TaskSnapshot, SNAPSHOT_COLUMNS, check_fields
+from .watchers import TaskWatchers
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+
+TASK_SHARED_DB_PATH = os.getenv("TASK_SHARED_DB_PATH", "data/tasks-shared.db")
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "86400"))
+# A running task whose owner has not sent a heartbeat for this long is orphaned
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "60"))
+TASK_HEARTBEAT_INTERVAL = float(os.getenv("TASK_HEARTBEAT_INTERVAL", "15"))
+# Updates made by other processes are only seen by re-reading the database
+TASK_WATCH_POLL_INTERVAL = float(os.getenv("TASK_WATCH_POLL_INTERVAL", "0.5"))
+
+SWEEP_INTERVAL = 60
+# Task ids per IN (...) query, under SQLite's bound parameter limit
+SNAPSHOTS_PER_QUERY = 500
+
+
+class SQLiteTaskBackend(TaskStateBackend):
+    """
+    Task backend shared by every uvicorn worker and API node that can reach the
+    same SQLite file. The database (in WAL mode, so readers never block the
+    writer) is the only source of truth; nothing is cached per process.
+    Each task is owned by the process running it, which keeps a heartbeat so
+    another process can take over the task if its owner dies.
+    """
+
+    name = "sqlite"
+    watch_poll_interval = TASK_WATCH_POLL_INTERVAL
+
+    def __init__(self, db_path=TASK_SHARED_DB_PATH, ttl=TASK_TTL_SECONDS,
+                 lease=TASK_LEASE_SECONDS, heartbeat_interval=TASK_HEARTBEAT_INTERVAL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.lease = lease
+        self.heartbeat_interval = heartbeat_interval
+        self._connections = ThreadConnections(db_path, pragmas=("synchronous = NORMAL",))
+        self._last_sweep = 0.0
+        self._orphan_callback = None
+        self._maintenance_thread = None
+        self.watchers = TaskWatchers()
+
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress NUMERIC,
+                scraper_statuses TEXT,
+                error TEXT,
+                company_id TEXT,
+                id_type TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT,
+                owner TEXT,
+                heartbeat_at REAL,
+                version INTEGER NOT NULL DEFAULT 0,
+                field_versions TEXT,
+                scrape_key TEXT,
+                priority TEXT
+            )
+        """)
+        add_missing_columns(db, {"version": "INTEGER NOT NULL DEFAULT 0", "field_versions": "TEXT",
+                                 "scrape_key": "TEXT", "priority": "TEXT"})
+        db.execute("CREATE INDEX IF NOT EXISTS tasks_scrape_key ON tasks (scrape_key, status)")
+        db.execute(BATCHES_TABLE)
+        db.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, heartbeat_at)")
+        db.commit()
+
+    def _connection(self):
+        return self._connections.get()
+
+    def create(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        now = time.time()
+        self._connection().execute("""
+            INSERT INTO tasks (task_id, status, company_id, id_type, created_at, updated_at, owner, heartbeat_at,
+                               scrape_key, priority)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (task_id, status, company_id, id_type, now, now, worker_id(), now, scrape_key, priority))
+        self.evict_expired()
+
+    def create_or_attach(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        if scrape_key is None:
+            self.create(task_id, status, company_id, id_type, priority=priority)
+            return task_id, True
+        db = self._connection()
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        # Look up and insert in one write transaction, so two workers cannot both create
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                f"SELECT task_id FROM tasks WHERE scrape_key = ? AND status NOT IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1", (scrape_key, *FINISHED_STATUSES)).fetchone()
+            if row is None:
+                now = time.time()
+                db.execute("""
+                    INSERT INTO tasks (task_id, status, company_id, id_type, created_at, updated_at, owner,
+                                       heartbeat_at, scrape_key, priority)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (task_id, status, company_id, id_type, now, now, worker_id(), now, scrape_key, priority))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if row is not None:
+            return row[0], False
+        self.evict_expired()
+        return task_id, True
+
+    def update(self, task_id, status, data=None, error=None, progress=None, scraper_statuses=None):
+        db = self._connection()
+        # Read and write in one transaction so concurrent writers cannot reuse a version
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.get_snapshot(task_id)
+            if current is None or current.status == "cancelled":
+                # A cancelled task keeps that status even if its worker still reports progress
+                db.execute("ROLLBACK")
+                return
+            snapshot = current.updated(status, error=error, progress=progress,
+                                       scraper_statuses=scraper_statuses, data=data)
+            assignments = ["status = ?", "version = ?", "updated_at = ?", "heartbeat_at = ?", "field_versions = ?"]
+            values = [snapshot.status, snapshot.version, snapshot.updated_at, snapshot.updated_at,
+                      snapshot.versions_json()]
+            if error is not None:
+                assignments.append("error = ?")
+                values.append(error)
+            if progress is not None:
+                assignments.append("progress = ?")
+                values.append(progress)
+            if scraper_statuses is not None:
+                assignments.append("scraper_statuses = ?")
+                values.append(json.dumps(scraper_statuses))
+            if data is not None:
+                assignments.append("data = ?")
+                values.append(json.dumps(data, ensure_ascii=False, default=str))
+            values.append(task_id)
+            db.execute(f"UPDATE tasks SET {', '.join(assignments)} WHERE task_id = ?", values)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self.watchers.notify(task_id)
+
+    def reopen(self, task_id):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.get_snapshot(task_id)
+            if current is None or current.status not in REOPENABLE_STATUSES:
+                db.execute("ROLLBACK")
+                return None
+            # The owner keeps its heartbeat until its pipeline stops and releases the task
+            owner, heartbeat_at = db.execute(
+                "SELECT owner, heartbeat_at FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            lease_expired = heartbeat_at is None or heartbeat_at < time.time() - self.lease
+            if owner not in (None, worker_id()) and not lease_expired:
+                db.execute("ROLLBACK")
+                return None
+            snapshot = current.reopened()
+            # The worker reopening the task runs it
+            db.execute(
+                "UPDATE tasks SET status = ?, version = ?, error = NULL, updated_at = ?, owner = ?, "
+                "heartbeat_at = ?, field_versions = ? WHERE task_id = ?",
+                (snapshot.status, snapshot.version, snapshot.updated_at, worker_id(), snapshot.updated_at,
+                 snapshot.versions_json(), task_id))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self.watchers.notify(task_id)
+        return snapshot
+
+    def release(self, task_id):
+        self._connection().execute(
+            "UPDATE tasks SET owner = NULL WHERE task_id = ? AND owner = ?", (task_id, worker_id()))
+
+    def get_snapshot(self, task_id):
+        row = self._connection().execute(
+            f"SELECT {SNAPSHOT_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        return TaskSnapshot.from_row(task_id, row)
+
+    def get_snapshots(self, task_ids):
+        """Return {task_id: TaskSnapshot, or None if unknown}, reading many tasks per query"""
+        task_ids = list(task_ids)
+        snapshots = dict.fromkeys(task_ids)
+        db = self._connection()
+        for start in range(0, len(task_ids), SNAPSHOTS_PER_QUERY):
+            chunk = task_ids[start:start + SNAPSHOTS_PER_QUERY]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = db.execute(
+                f"SELECT task_id, {SNAPSHOT_COLUMNS} FROM tasks WHERE task_id IN ({placeholders})", chunk)
+            for row in rows:
+                snapshots[row[0]] = TaskSnapshot.from_row(row[0], row[1:])
+        return snapshots
+
+    def get(self, task_id, fields=None, since_version=None):
+        check_fields(fields)
+        db = self._connection()
+        # One read transaction, so the record is a consistent view of a single version
+        db.execute("BEGIN")
+        try:
+            snapshot = self.get_snapshot(task_id)
+            if snapshot is None:
+                return None
+            data = None
+            if snapshot.has_data and (fields is None or "data" in fields):
+                keys = snapshot.data_keys(since_version)
+                if keys is None or keys:
+                    data = load_task_data(db, task_id, keys)
+        finally:
+            db.execute("COMMIT")
+        return snapshot.to_record(data, fields, since_version)
+
+    def claim_unfinished(self):
+        """Atomically take over unfinished tasks whose owner stopped sending heartbeats"""
+        cutoff = time.time() - self.lease
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                f"SELECT task_id, company_id, id_type, priority FROM tasks WHERE status NOT IN ({placeholders}) "
+                "AND (heartbeat_at IS NULL OR heartbeat_at < ?) ORDER BY created_at",
+                (*FINISHED_STATUSES, cutoff)).fetchall()
+            now = time.time()
+            for (task_id, _, _, _) in rows:
+                db.execute("UPDATE tasks SET owner = ?, heartbeat_at = ? WHERE task_id = ?",
+                           (worker_id(), now, task_id))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return [tuple(row) for row in rows]
+
+    def watch_orphans(self, callback):
+        """Start heartbeating this worker's tasks and hand orphaned ones to `callback`"""
+        self._orphan_callback = callback
+        if self._maintenance_thread is None:
+            self._maintenance_thread = threading.Thread(
+                target=self._maintenance_loop, name="task-backend-maintenance", daemon=True)
+            self._maintenance_thread.start()
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                # Finished tasks too: a cancelled task is owned until its pipeline stops
+                self._connection().execute(
+                    "UPDATE tasks SET heartbeat_at = ? WHERE owner = ?", (time.time(), worker_id()))
+                for task_id, company_id, id_type, priority in self.claim_unfinished():
+                    print(f"Taking over orphaned task {task_id}")
+                    self._orphan_callback(task_id, company_id, id_type, priority)
+                self.evict_expired()
+            except Exception as e:
+                print(f"Warning: Task backend maintenance failed: {str(e)}")
+
+    def evict_expired(self, force=False):
+        now = time.time()
+        if not force and now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        db = self._connection()
+        db.execute(
+            f"DELETE FROM tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*FINISHED_STATUSES, now - self.ttl))
+        db.execute("DELETE FROM batches WHERE created_at < ?", (now - self.ttl,))
+
+    def stats(self):
+        row = self._connection().execute(
+            "SELECT COUNT(*), SUM(owner = ?) FROM tasks", (worker_id(),)).fetchone()
+        return {"backend": self.name, "worker_id": worker_id(), "tasks_stored": row[0], "tasks_owned": row[1] or 0}
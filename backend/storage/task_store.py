@@ -0,0 +1,232 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .base import TaskStateBackend, FINISHED_STATUSES, REOPENABLE_STATUSES, BATCHES_TABLE, load_task_data, add_missing_columns
+from .connections import ThreadConnections
+from .snapshot import TaskSnapshot, SNAPSHOT_COLUMNS, check_fields
+from .watchers import TaskWatchers
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+
+TASK_DB_PATH = os.getenv("TASK_DB_PATH", "data/tasks.db")
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "86400"))
+TASK_MEMORY_LIMIT = int(os.getenv("TASK_MEMORY_LIMIT", "1000"))
+
+SWEEP_INTERVAL = 60
+
+
+class TaskStore(TaskStateBackend):
+    """
+    Default, single-process task backend. Only small metadata (status,
+    progress, scraper statuses) is held in memory, as one immutable
+    TaskSnapshot per task, capped with LRU eviction. Results and compiled
+    reports are written to SQLite, which also keeps the metadata so tasks
+    survive restarts. Finished tasks are deleted once older than the TTL.
+
+    Writers build the next snapshot under a per-task lock and swap it in;
+    readers just take the current snapshot, so polling never waits on a
+    writer and a slow response never holds a lock.
+    """
+
+    name = "memory"
+
+    def __init__(self, db_path=TASK_DB_PATH, ttl=TASK_TTL_SECONDS, memory_limit=TASK_MEMORY_LIMIT):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_limit = memory_limit
+        self._snapshots = {}
+        # Recency order of the cached snapshots, only touched by writers
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._task_locks = {}
+        self._task_locks_lock = threading.Lock()
+        self._connections = ThreadConnections(db_path)
+        self._last_sweep = 0.0
+        self._create_lock = threading.Lock()
+        self.watchers = TaskWatchers()
+
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress NUMERIC,
+                scraper_statuses TEXT,
+                error TEXT,
+                company_id TEXT,
+                id_type TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                field_versions TEXT,
+                scrape_key TEXT,
+                priority TEXT
+            )
+        """)
+        add_missing_columns(db, {"version": "INTEGER NOT NULL DEFAULT 0", "field_versions": "TEXT",
+                                 "scrape_key": "TEXT", "priority": "TEXT"})
+        db.execute("CREATE INDEX IF NOT EXISTS tasks_scrape_key ON tasks (scrape_key, status)")
+        db.execute(BATCHES_TABLE)
+
+    def _connection(self):
+        return self._connections.get()
+
+    def _task_lock(self, task_id):
+        with self._task_locks_lock:
+            lock = self._task_locks.get(task_id)
+            if lock is None:
+                lock = self._task_locks[task_id] = threading.Lock()
+            return lock
+
+    def _remember(self, snapshot):
+        with self._recent_lock:
+            current = self._snapshots.get(snapshot.task_id)
+            if current is not None and current.version > snapshot.version:
+                # A writer swapped in a newer version while this one was loaded from disk
+                return
+            self._snapshots[snapshot.task_id] = snapshot
+            self._recent[snapshot.task_id] = None
+            self._recent.move_to_end(snapshot.task_id)
+            while len(self._recent) > self.memory_limit:
+                # Everything is already on disk, so evicting only drops the cached copy
+                task_id, _ = self._recent.popitem(last=False)
+                self._snapshots.pop(task_id, None)
+
+    def _load_snapshot(self, task_id):
+        row = self._connection().execute(
+            f"SELECT {SNAPSHOT_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        return TaskSnapshot.from_row(task_id, row)
+
+    def _save_snapshot(self, snapshot, data=None):
+        values = [
+            snapshot.status,
+            snapshot.version,
+            snapshot.progress,
+            json.dumps(dict(snapshot.scraper_statuses)) if snapshot.scraper_statuses is not None else None,
+            snapshot.error,
+            snapshot.updated_at,
+            snapshot.versions_json(),
+        ]
+        data_assignment = ""
+        if data is not None:
+            data_assignment = ", data = ?"
+            values.append(json.dumps(data, ensure_ascii=False, default=str))
+        values.append(snapshot.task_id)
+        self._connection().execute(
+            "UPDATE tasks SET status = ?, version = ?, progress = ?, scraper_statuses = ?, error = ?, "
+            f"updated_at = ?, field_versions = ?{data_assignment} WHERE task_id = ?", values)
+
+    def create(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        """Register a new task"""
+        snapshot = TaskSnapshot(task_id=task_id, status=status, company_id=company_id, id_type=id_type)
+        self._connection().execute("""
+            INSERT INTO tasks (task_id, status, company_id, id_type, created_at, updated_at, version, scrape_key,
+                               priority)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (task_id, status, company_id, id_type, snapshot.created_at, snapshot.updated_at, snapshot.version,
+              scrape_key, priority))
+        self._remember(snapshot)
+        self.evict_expired()
+
+    def create_or_attach(self, task_id, status, company_id=None, id_type=None, scrape_key=None, priority=None):
+        """Register a new task, or return the unfinished task with the same scrape key"""
+        with self._create_lock:
+            if scrape_key is not None:
+                placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+                row = self._connection().execute(
+                    f"SELECT task_id FROM tasks WHERE scrape_key = ? AND status NOT IN ({placeholders}) "
+                    "ORDER BY created_at LIMIT 1", (scrape_key, *FINISHED_STATUSES)).fetchone()
+                if row is not None:
+                    return row[0], False
+            self.create(task_id, status, company_id, id_type, scrape_key, priority)
+            return task_id, True
+
+    def update(self, task_id, status, data=None, error=None, progress=None, scraper_statuses=None):
+        """Swap in the next snapshot of a task; `data` only goes to disk"""
+        with self._task_lock(task_id):
+            current = self.get_snapshot(task_id)
+            if current is None or current.status == "cancelled":
+                # A cancelled task keeps that status even if its worker still reports progress
+                return
+            snapshot = current.updated(status, error=error, progress=progress,
+                                       scraper_statuses=scraper_statuses, data=data)
+            self._save_snapshot(snapshot, data)
+            self._remember(snapshot)
+        self.watchers.notify(task_id)
+
+    def reopen(self, task_id):
+        """Move a failed or cancelled task back to pending, keeping its results"""
+        with self._task_lock(task_id):
+            current = self.get_snapshot(task_id)
+            if current is None or current.status not in REOPENABLE_STATUSES:
+                return None
+            snapshot = current.reopened()
+            self._save_snapshot(snapshot)
+            self._remember(snapshot)
+        self.watchers.notify(task_id)
+        return snapshot
+
+    def get_snapshot(self, task_id):
+        """Return the current snapshot of a task without its payload, or None if unknown"""
+        snapshot = self._snapshots.get(task_id)
+        if snapshot is None:
+            snapshot = self._load_snapshot(task_id)
+            if snapshot is not None:
+                self._remember(snapshot)
+        return snapshot
+
+    def get(self, task_id, fields=None, since_version=None):
+        """Return the task record in the API shape, or None if unknown"""
+        check_fields(fields)
+        snapshot = self.get_snapshot(task_id)
+        if snapshot is None:
+            return None
+        data = None
+        if snapshot.has_data and (fields is None or "data" in fields):
+            keys = snapshot.data_keys(since_version)
+            if keys is None or keys:
+                data = load_task_data(self._connection(), task_id, keys)
+        return snapshot.to_record(data, fields, since_version)
+
+    def claim_unfinished(self):
+        """Return (task_id, company_id, id_type, priority) for tasks that were still pending or running"""
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        rows = self._connection().execute(
+            f"SELECT task_id, company_id, id_type, priority FROM tasks WHERE status NOT IN ({placeholders}) "
+            "ORDER BY created_at", FINISHED_STATUSES).fetchall()
+        return [tuple(row) for row in rows]
+
+    def evict_expired(self, force=False):
+        """Delete finished tasks older than the TTL (at most once per sweep interval)"""
+        now = time.time()
+        if not force and now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        db = self._connection()
+        expired = db.execute(
+            f"SELECT task_id FROM tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*FINISHED_STATUSES, cutoff)).fetchall()
+        db.execute(
+            f"DELETE FROM tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*FINISHED_STATUSES, cutoff))
+        db.execute("DELETE FROM batches WHERE created_at < ?", (cutoff,))
+        with self._recent_lock:
+            for (task_id,) in expired:
+                self._recent.pop(task_id, None)
+                self._snapshots.pop(task_id, None)
+        with self._task_locks_lock:
+            for (task_id,) in expired:
+                self._task_locks.pop(task_id, None)
+
+    def stats(self):
+        stored = self._connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return {"backend": self.name, "tasks_in_memory": len(self._snapshots), "tasks_stored": stored}
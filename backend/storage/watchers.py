@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+
+class TaskWatchers:
+    """
+    Wakes up coroutines waiting for a task to change. Updates happen on worker
+    threads while waiters live on the API event loop, so each waiter registers
+    its loop and event and is woken with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+
+    def add(self, task_id):
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.setdefault(task_id, []).append(waiter)
+        return waiter
+
+    def add_many(self, task_ids):
+        """Register one waiter woken by a change to any of the tasks"""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            for task_id in task_ids:
+                self._waiters.setdefault(task_id, []).append(waiter)
+        return waiter
+
+    def remove_many(self, task_ids, waiter):
+        for task_id in task_ids:
+            self.remove(task_id, waiter)
+
+    def remove(self, task_id, waiter):
+        with self._lock:
+            waiters = self._waiters.get(task_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def notify(self, task_id):
+        with self._lock:
+            waiters = list(self._waiters.get(task_id, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop is closed
+                pass
+
+    def count(self):
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Tests import the backend modules the way app.py does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# storage reads its database paths at import, so point them away from data/ before anything imports it
+_data_dir = tempfile.mkdtemp(prefix="backend-tests-")
+for name, filename in (("TASK_DB_PATH", "tasks.db"), ("TASK_SHARED_DB_PATH", "tasks-shared.db"),
+                       ("SOURCE_CACHE_PATH", "source-cache.db")):
+    os.environ.setdefault(name, os.path.join(_data_dir, filename))
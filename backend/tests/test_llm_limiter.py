@@ -0,0 +1,159 @@
+"""
+Tests of the process-wide LLM rate limiter: window accounting, fairness
+across tasks, and adaptation to the provider's 429s and x-ratelimit headers,
+the last ones against the local mock OpenAI server.
+"""
+
+from benchmarks.mock_llm_server import MockLLMServer
+from helpers import llm_client, llm_limiter
+from helpers.event_loop import run_on_shared_loop
+from helpers.llm_limiter import LLMRateLimiter
+import asyncio
+import pytest
+import time
+
+
+@pytest.fixture
+def short_window(monkeypatch):
+    """Shrink the rate window so the tests do not wait for minutes"""
+    monkeypatch.setattr(llm_limiter, "WINDOW_SECONDS", 0.5)
+    monkeypatch.setattr(llm_limiter, "POLL_INTERVAL", 0.01)
+
+
+def elapsed(coro):
+    started = time.monotonic()
+    result = asyncio.run(coro)
+    return time.monotonic() - started, result
+
+
+def test_requests_per_minute_window(short_window):
+    limiter = LLMRateLimiter(requests_per_minute=2, tokens_per_minute=1_000_000)
+
+    async def calls(count):
+        for _ in range(count):
+            await limiter.acquire(10)
+
+    seconds, _ = elapsed(calls(2))
+    assert seconds < 0.2
+    seconds, _ = elapsed(calls(1))
+    # The third call waits for the first one to leave the window
+    assert seconds >= 0.3
+    assert limiter.snapshot()["granted"] == 3
+
+
+def test_tokens_per_minute_window_and_reconcile(short_window):
+    limiter = LLMRateLimiter(requests_per_minute=100, tokens_per_minute=100)
+
+    async def scenario():
+        first = await limiter.acquire(60)
+        # Only 10 tokens were used, which leaves room for the next call at once
+        first.release(10)
+        started = time.monotonic()
+        await limiter.acquire(60)
+        reconciled_wait = time.monotonic() - started
+        started = time.monotonic()
+        await limiter.acquire(60)
+        return reconciled_wait, time.monotonic() - started
+
+    reconciled_wait, over_budget_wait = asyncio.run(scenario())
+    assert reconciled_wait < 0.2
+    assert over_budget_wait >= 0.3
+    assert limiter.snapshot()["tokens_in_window"] <= 100
+
+
+def test_round_robin_across_tasks(short_window):
+    limiter = LLMRateLimiter(requests_per_minute=1, tokens_per_minute=1_000_000)
+    granted = []
+
+    async def call(task_id):
+        await limiter.acquire(10, task_key=task_id)
+        granted.append(task_id)
+
+    async def scenario():
+        # Fill the window so every call below has to queue
+        await limiter.acquire(10, task_key="warmup")
+        busy = [asyncio.ensure_future(call("busy")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        other = asyncio.ensure_future(call("other"))
+        await asyncio.gather(*busy, other)
+
+    asyncio.run(scenario())
+    # The other task is served right after the busy task's first call, not after all three
+    assert granted == ["busy", "other", "busy", "busy"]
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    server = MockLLMServer(latency=0.0).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=1_000_000)
+    from config import model
+    monkeypatch.setattr(model, "llm_rate_limiter", limiter)
+    monkeypatch.setattr(llm_client, "llm_rate_limiter", limiter)
+    yield server, limiter
+    llm_client.close_llm_clients()
+    server.stop()
+
+
+def invoke(workload="browser_navigation"):
+    from browser_use.llm.messages import UserMessage
+    from config.model import RoutedChatModel
+
+    started = time.monotonic()
+    response = run_on_shared_loop(RoutedChatModel(workload).ainvoke([UserMessage(content="hello")]))
+    return time.monotonic() - started, response
+
+
+def tier_counter(tier, name):
+    from config.model import model_metrics
+    return model_metrics.snapshot().get(tier, {}).get(name, 0)
+
+
+def test_429_retry_after_pauses_callers(mock_llm):
+    server, limiter = mock_llm
+    # More 429s than the SDK retries by itself, so the error reaches the limiter;
+    # the SDK honours retry-after-ms, the limiter Retry-After
+    server.rate_limit(10, {"retry-after-ms": "10", "retry-after": "0.5"})
+
+    fallbacks = tier_counter("standard", "fallbacks")
+    seconds, response = invoke()
+    assert response.completion
+    assert limiter.snapshot()["rate_limited"] == 1
+    # The same tier waited for Retry-After, not the default pause, before calling again
+    assert 0.4 <= seconds < llm_limiter.DEFAULT_RETRY_AFTER
+    assert tier_counter("standard", "fallbacks") == fallbacks
+
+
+def test_persistent_429_never_escalates_to_the_bigger_tier(mock_llm):
+    from browser_use.llm.exceptions import ModelRateLimitError
+    from config.model import LLM_RATE_LIMIT_RETRIES
+
+    server, limiter = mock_llm
+    server.rate_limit(1000, {"retry-after-ms": "1", "retry-after": "0.01"})
+    standard_calls = tier_counter("standard", "calls")
+    with pytest.raises(ModelRateLimitError):
+        invoke()
+    assert limiter.snapshot()["rate_limited"] == LLM_RATE_LIMIT_RETRIES + 1
+    assert tier_counter("standard", "calls") == standard_calls
+
+
+def test_ratelimit_headers_tighten_budget(mock_llm):
+    server, limiter = mock_llm
+    server.headers = {
+        "x-ratelimit-limit-requests": "3",
+        "x-ratelimit-limit-tokens": "5000",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "500ms",
+    }
+
+    invoke()
+    snapshot = limiter.snapshot()
+    assert snapshot["requests_per_minute_limit"] == 3
+    assert snapshot["tokens_per_minute_limit"] == 5000
+    assert 0 < snapshot["blocked_for"] <= 0.5
+
+    server.headers = {}
+    seconds, _ = invoke()
+    # The next call waited for the reported reset
+    assert seconds >= 0.3
@@ -0,0 +1,100 @@
+"""Tests of the scraper retry policy and its circuit breaker bookkeeping"""
+
+from browser_use.llm.exceptions import ModelProviderError, ModelRateLimitError
+from helpers.cassette import CassetteMiss
+from helpers.circuit_breaker import is_transient
+from storage import SourceCache, TaskStore
+import asyncio
+import httpx
+import pytest
+import time
+
+
+def http_status_error(status_code):
+    request = httpx.Request("GET", "https://api.societe.com/api/v1/entreprise/542951429")
+    return httpx.HTTPStatusError("Request failed", request=request,
+                                 response=httpx.Response(status_code, request=request))
+
+
+@pytest.mark.parametrize("error", [
+    ConnectionResetError("reset"),
+    asyncio.TimeoutError(),
+    httpx.ConnectError("refused"),
+    ModelRateLimitError("slow down"),
+    ModelProviderError("bad gateway", status_code=502),
+    RuntimeError("net::ERR_CONNECTION_RESET at https://www.pappers.fr/"),
+    http_status_error(503),
+])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize("error", [
+    CassetteMiss("no recording"),
+    ValueError("Unknown model tier"),
+    ModelProviderError("invalid request", status_code=400),
+    RuntimeError("agent crashed"),
+    RuntimeError("No filing found for SIREN 542951429"),
+    RuntimeError("Extracted content truncated at 15034 bytes"),
+    http_status_error(404),
+])
+def test_permanent_errors(error):
+    assert not is_transient(error)
+
+
+@pytest.fixture
+def backend_app(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    import app
+    # The stores are built when app is first imported, from paths storage read at collection
+    monkeypatch.setattr(app, "task_store", TaskStore(db_path=str(tmp_path / "tasks.db")))
+    monkeypatch.setattr(app, "source_cache", SourceCache(db_path=str(tmp_path / "source-cache.db")))
+    return app
+
+
+def failing(error, calls):
+    def attempt(timeout, max_steps):
+        calls.append(time.monotonic())
+        raise error
+    return attempt
+
+
+def test_permanent_error_is_not_retried(backend_app):
+    calls = []
+    with pytest.raises(CassetteMiss):
+        backend_app.run_with_retries("task", "societe", failing(CassetteMiss("no recording"), calls),
+                                     time.monotonic() + 600)
+    assert len(calls) == 1
+
+
+def test_transient_error_is_retried(backend_app, monkeypatch):
+    monkeypatch.setattr(backend_app, "sleep_unless_cancelled", lambda task_id, seconds: None)
+    calls = []
+    with pytest.raises(ConnectionError):
+        backend_app.run_with_retries("task", "google", failing(ConnectionResetError("reset"), calls),
+                                     time.monotonic() + 600)
+    assert len(calls) == backend_app.limits_for("google")["retries"] + 1
+
+
+def test_local_capacity_does_not_count_against_the_source(backend_app):
+    before = backend_app.source_breaker.snapshot().get("infogreffe", {}).get("failures", 0)
+    error = backend_app.BrowserCapacityTimeout("No browser session free on infogreffe.fr within 300s")
+    for _ in range(backend_app.source_breaker.threshold + 1):
+        with pytest.raises(backend_app.BrowserCapacityTimeout):
+            backend_app.run_with_retries("task", "infogreffe", failing(error, []), time.monotonic() + 600)
+    circuit = backend_app.source_breaker.snapshot()["infogreffe"]
+    assert circuit["failures"] == before
+    assert circuit["state"] == "closed"
+
+
+def test_memory_kill_keeps_partial_result_off_the_breaker(backend_app):
+    before = backend_app.source_breaker.snapshot().get("societe", {}).get("failures", 0)
+    calls = []
+    partial = {"raw_data": "got page 1", "status": "partial"}
+    error = backend_app.BrowserMemoryExceeded("Browser killed after using 900 MB", partial)
+    with pytest.raises(backend_app.BrowserMemoryExceeded) as raised:
+        backend_app.run_with_retries("task", "societe", failing(error, calls), time.monotonic() + 600)
+    assert len(calls) == 1
+    assert backend_app.source_breaker.snapshot().get("societe", {}).get("failures", 0) == before
+    config = {"name": "societe", "display_name": "Societe"}
+    assert backend_app.timed_out_result(config, raised.value) == partial
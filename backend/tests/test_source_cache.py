@@ -0,0 +1,20 @@
+"""Tests of the per-source result cache"""
+
+from storage import SourceCache
+
+
+def test_stale_fallback_does_not_count_a_second_miss(tmp_path):
+    cache = SourceCache(db_path=str(tmp_path / "source-cache.db"))
+    assert cache.get("infogreffe", "123456789") is None
+    assert cache.get("infogreffe", "123456789", stale=True) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entry_is_served_stale(tmp_path):
+    cache = SourceCache(db_path=str(tmp_path / "source-cache.db"))
+    cache.put("infogreffe", "123456789", {"siren": "123456789"})
+    assert cache.get("infogreffe", "123456789", max_age=0) is None
+    result, _ = cache.get("infogreffe", "123456789", stale=True)
+    assert result == {"siren": "123456789"}
+    stats = cache.stats()
+    assert (stats["misses"], stats["stale_hits"], stats["entries"]) == (1, 1, 1)
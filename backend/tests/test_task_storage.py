@@ -0,0 +1,121 @@
+"""Tests of the task state backends"""
+
+from storage import SQLiteTaskBackend, TaskStore
+import asyncio
+import pytest
+import sqlite3
+import time
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return TaskStore(db_path=str(tmp_path / "tasks.db"))
+    return SQLiteTaskBackend(db_path=str(tmp_path / "tasks-shared.db"))
+
+
+def test_delta_returns_changed_keys(backend):
+    backend.create("task", "running")
+    backend.update("task", "running", data={"infogreffe": {"siren": "123"}})
+    version = backend.get_snapshot("task").version
+    backend.update("task", "running", data={"infogreffe": {"siren": "123"}, "pappers": "report"})
+    record = backend.get("task", since_version=version)
+    assert record["data"] == {"pappers": "report"}
+
+
+def test_keys_that_are_not_identifiers(backend):
+    data = {'quoted "key"': 1, "dotted.key": 2, "spaced key": 3}
+    backend.create("task", "running")
+    backend.update("task", "running", data={"other": 0})
+    version = backend.get_snapshot("task").version
+    backend.update("task", "running", data={"other": 0, **data})
+    assert backend.get("task", since_version=version)["data"] == data
+
+
+def test_many_changed_keys(backend):
+    data = {f"key_{index}": index for index in range(100)}
+    backend.create("task", "running")
+    backend.update("task", "running", data={"other": 0})
+    version = backend.get_snapshot("task").version
+    backend.update("task", "running", data={"other": 0, **data})
+    assert backend.get("task", since_version=version)["data"] == data
+
+
+def test_unknown_fields_are_rejected(backend):
+    backend.create("task", "running")
+    with pytest.raises(ValueError):
+        backend.get("task", fields=["status", "bogus"])
+
+
+def test_wait_for_changes_returns_changed_tasks(backend):
+    for task_id in ("a", "b", "c"):
+        backend.create(task_id, "running")
+    versions = {task_id: snapshot.version for task_id, snapshot in backend.get_snapshots(["a", "b", "c"]).items()}
+
+    async def scenario():
+        waiting = asyncio.ensure_future(backend.wait_for_changes(versions, timeout=5))
+        await asyncio.sleep(0.05)
+        backend.update("b", "running", progress=50)
+        return await waiting
+
+    changed = asyncio.run(scenario())
+    assert list(changed) == ["b"]
+    assert changed["b"].progress == 50
+    assert backend.watchers.count() == 0
+    assert asyncio.run(backend.wait_for_changes(versions | {"b": changed["b"].version}, timeout=0.1)) == {}
+
+
+def test_unfinished_tasks_keep_their_priority(backend):
+    backend.create_or_attach("bulk-task", "running", "111", "SIREN", scrape_key="bulk", priority="bulk")
+    backend.create_or_attach("ui-task", "pending", "222", "SIREN", scrape_key="ui", priority="interactive")
+    if isinstance(backend, SQLiteTaskBackend):
+        # Tasks are only claimed once their owner's heartbeat is older than the lease
+        backend.lease = -1
+    claimed = {task_id: priority for task_id, _, _, priority in backend.claim_unfinished()}
+    assert claimed == {"bulk-task": "bulk", "ui-task": "interactive"}
+
+
+def test_only_failed_or_cancelled_tasks_reopen(backend):
+    backend.create("done", "completed")
+    backend.create("cancelled", "running")
+    backend.update("cancelled", "cancelled")
+    assert backend.reopen("done") is None
+    assert backend.reopen("cancelled").status == "pending"
+    assert backend.reopen("cancelled") is None
+
+
+def test_reopen_waits_for_the_owner_to_release(tmp_path):
+    backend = SQLiteTaskBackend(db_path=str(tmp_path / "tasks-shared.db"))
+    backend.create("task", "running")
+    backend.update("task", "cancelled")
+    # Still owned by a live worker whose pipeline has not stopped yet
+    backend._connection().execute("UPDATE tasks SET owner = 'other-host:1' WHERE task_id = 'task'")
+    assert backend.reopen("task") is None
+    backend._connection().execute("UPDATE tasks SET owner = NULL WHERE task_id = 'task'")
+    assert backend.reopen("task").status == "pending"
+
+
+def test_promoted_task_restarts_as_interactive(backend):
+    backend.create_or_attach("bulk-task", "pending", "111", "SIREN", scrape_key="bulk", priority="bulk")
+    backend.set_priority("bulk-task", "interactive")
+    if isinstance(backend, SQLiteTaskBackend):
+        backend.lease = -1
+    assert [priority for _, _, _, priority in backend.claim_unfinished()] == ["interactive"]
+
+
+def test_shared_database_from_before_versions_is_migrated(tmp_path):
+    db_path = str(tmp_path / "tasks-shared.db")
+    db = sqlite3.connect(db_path)
+    db.execute("""
+        CREATE TABLE tasks (task_id TEXT PRIMARY KEY, status TEXT NOT NULL, progress NUMERIC,
+                            scraper_statuses TEXT, error TEXT, company_id TEXT, id_type TEXT,
+                            created_at REAL NOT NULL, updated_at REAL NOT NULL, data TEXT,
+                            owner TEXT, heartbeat_at REAL)
+    """)
+    db.execute("INSERT INTO tasks (task_id, status, created_at, updated_at) VALUES ('old', 'completed', ?, ?)",
+               (time.time(), time.time()))
+    db.commit()
+    db.close()
+    backend = SQLiteTaskBackend(db_path=db_path)
+    assert backend.get_snapshot("old").version == 0
+    assert backend.get("old")["status"] == "completed"
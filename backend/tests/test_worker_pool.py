@@ -0,0 +1,56 @@
+"""Tests of the priority classes of the task worker pool"""
+
+from helpers.worker_pool import WorkerPool
+import threading
+
+
+def run_bulk_job(pool, interactive_jobs):
+    """Run a bulk job that submits interactive work and reports whether it was asked to yield"""
+    asked = []
+    done = threading.Event()
+
+    def bulk():
+        for _ in range(interactive_jobs):
+            pool.submit(threading.Event().wait, 0.5)
+        asked.append(pool.preempt_requested())
+        done.set()
+
+    pool.submit(bulk, priority="bulk")
+    assert done.wait(5)
+    return asked[0]
+
+
+def test_preempts_when_no_worker_is_free():
+    pool = WorkerPool(size=1, classes={"interactive": {"share": 1.0}, "bulk": {"share": 1.0}})
+    assert run_bulk_job(pool, 1)
+    assert pool.snapshot()["classes"]["bulk"]["preempted"] == 1
+
+
+def test_no_preemption_while_a_worker_is_free():
+    pool = WorkerPool(size=3, classes={"interactive": {"share": 1.0}, "bulk": {"share": 1.0}})
+    # One interactive job queued or running, a third worker still idle
+    assert not run_bulk_job(pool, 1)
+    assert pool.snapshot()["classes"]["bulk"]["preempted"] == 0
+
+
+def test_promoted_job_runs_before_queued_bulk_work():
+    pool = WorkerPool(size=1, classes={"interactive": {"share": 1.0}, "bulk": {"share": 1.0}})
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+    order = []
+
+    def record(name):
+        order.append(name)
+        if len(order) == 3:
+            finished.set()
+
+    pool.submit(lambda: started.set() or release.wait(5))
+    assert started.wait(5)
+    for name in ("bulk-1", "bulk-2", "bulk-3"):
+        pool.submit(record, name, priority="bulk")
+    assert pool.promote(lambda name: name == "bulk-3", "interactive")
+    assert not pool.promote(lambda name: name == "missing", "interactive")
+    classes = pool.snapshot()["classes"]
+    assert (classes["interactive"]["queued"], classes["bulk"]["queued"]) == (1, 2)
+    release.set()
+    assert finished.wait(5)
+    assert order == ["bulk-3", "bulk-1", "bulk-2"]
@@ -1,4 +1,5 @@
 import requests
+import json
 import time
 from dotenv import load_dotenv
 import os
@@ -27,60 +28,154 @@ class ApiClient:
         response = requests.get(url, params=params)
         return response
 
-    def scrape_company(self, company_id: str, id_type: str):
+    def scrape_company(self, company_id: str, id_type: str, task_id: str = None, max_age: float = None):
         """
         Scrape the company information from the website.
+        Passing the task_id of a failed or interrupted task resumes it, and
+        max_age (seconds) re-scrapes only the sources cached longer ago.
         """
         url = f"{self.base_url}/scrape-company"
         params = {
             "company_id": company_id,
             "id_type": id_type
         }
+        if task_id:
+            params["task_id"] = task_id
+        if max_age is not None:
+            params["max_age"] = max_age
 
         response = requests.post(url, params=params)
         return response
 
+    def scrape_batch(self, companies: list, id_type: str = "SIREN", max_age: float = None):
+        """
+        Scrape a list of companies, returns the batch id and one task per company.
+        """
+        url = f"{self.base_url}/scrape-batch"
+        body = {"companies": companies, "id_type": id_type}
+        if max_age is not None:
+            body["max_age"] = max_age
+
+        response = requests.post(url, json=body)
+        return response
+
+    def get_batch_status(self, batch_id: str):
+        """
+        Get the aggregate progress of a batch and the status of each company.
+        """
+        url = f"{self.base_url}/get-batch-status/{batch_id}"
+        response = requests.get(url)
+        return response
+
+    def cancel_task(self, task_id: str):
+        """
+        Cancel a running scraping task.
+        """
+        url = f"{self.base_url}/cancel-task/{task_id}"
+        response = requests.post(url)
+        return response
+
+    def stream_task_status(self, task_id: str, progress_container, progress_bar=None, status_display=None, progress_text=None):
+        """
+        Follow a task through the Server-Sent Events stream of the backend.
+        Returns the task data when completed, False when it failed, or None if
+        the stream is not available so the caller can fall back to polling.
+        """
+        url = f"{self.base_url}/task-events/{task_id}"
+        try:
+            with requests.get(url, stream=True, timeout=(10, 60),
+                              headers={"Accept": "text/event-stream"}) as response:
+                if response.status_code != 200:
+                    return None
+
+                data_lines = []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line is None:
+                        continue
+                    if line.startswith("data:"):
+                        data_lines.append(line[5:].strip())
+                    elif line == "" and data_lines:
+                        # A blank line ends the event
+                        task_data = json.loads("\n".join(data_lines))
+                        data_lines = []
+                        outcome = self._handle_task_update(
+                            task_data, progress_container, progress_bar, status_display, progress_text)
+                        if outcome is not None:
+                            return outcome
+        except (requests.RequestException, ValueError):
+            return None
+        return None
+
     def poll_task_status(self, task_id: str, progress_container, progress_bar=None, status_display=None, progress_text=None):
         """
-        Poll the status of a task
+        Poll the status of a task, through the event stream when the backend supports it
         """
+        result = self.stream_task_status(
+            task_id, progress_container, progress_bar, status_display, progress_text)
+        if result is not None:
+            return result
+
         url = f"{self.base_url}/get-task-status/{task_id}"
+        # Only the progress fields while running, and nothing at all while unchanged.
+        # The backend holds each request until the task changes (long-polling).
+        params = {"fields": "status,progress,scraper_statuses,error", "wait": 30}
+        headers = {}
         while True:
             try:
-                response = requests.get(url)
+                response = requests.get(url, params=params, headers=headers, timeout=60)
+                if response.status_code == 304:
+                    continue
                 if response.status_code == 200:
                     result = response.json()
                     task_data = result.get("data", {})
-                    status = task_data.get("status")
-                    progress = task_data.get("progress", 0)
-                    scraper_statuses = task_data.get("scraper_statuses", {})
-
-                    # Update progress bar and percentage text if provided
-                    if progress_bar is not None:
-                        progress_bar.progress(progress / 100.0)
-                    
-                    if progress_text is not None:
-                        progress_text.write(f"**Progression: {progress:.0f}%**")
-
-                    # Update status display if provided
-                    if status_display is not None:
-                        status_display(scraper_statuses)
-
-                        if status == "completed":
-                            progress_container.success("Scraping terminé")
-                            return task_data
-                    elif status == "failed":
-                        error_message = task_data.get("error", "Unknown error")
-                        progress_container.error(error_message)
-                        return False
-                    elif status == "cancelled":
-                        progress_container.error("Task cancelled")
-                        return False
-
-                    time.sleep(2)
+                    if response.headers.get("ETag"):
+                        headers["If-None-Match"] = response.headers["ETag"]
+                    if task_data.get("status") == "completed":
+                        # Fetch the results once, with the final record
+                        task_data = requests.get(url).json().get("data", {})
+                    outcome = self._handle_task_update(
+                        task_data, progress_container, progress_bar, status_display, progress_text)
+                    if outcome is not None:
+                        return outcome
+
+                    if "If-None-Match" not in headers:
+                        # No version to wait on, fall back to a fixed interval
+                        time.sleep(2)
                 else:
                     raise Exception(
                         f"Failed to get task status: {response.status_code}")
             except Exception as e:
                 progress_container.error(f"Scraping failed: {str(e)}")
                 return False
+
+    def _handle_task_update(self, task_data, progress_container, progress_bar=None, status_display=None, progress_text=None):
+        """
+        Show one task update. Returns the task data when completed, False when
+        failed or cancelled, and None while the task is still running.
+        """
+        status = task_data.get("status")
+        progress = task_data.get("progress", 0)
+        scraper_statuses = task_data.get("scraper_statuses", {})
+
+        # Update progress bar and percentage text if provided
+        if progress_bar is not None:
+            progress_bar.progress(progress / 100.0)
+
+        if progress_text is not None:
+            progress_text.write(f"**Progression: {progress:.0f}%**")
+
+        # Update status display if provided
+        if status_display is not None:
+            status_display(scraper_statuses)
+
+        if status == "completed":
+            progress_container.success("Scraping terminé")
+            return task_data
+        elif status == "failed":
+            error_message = task_data.get("error", "Unknown error")
+            progress_container.error(error_message)
+            return False
+        elif status == "cancelled":
+            progress_container.error("Task cancelled")
+            return False
+        return None
@@ -178,6 +178,8 @@ def scrape_company(company, progress_container):
                             status_placeholders[scraper_key].write(f"- {ok}")
                         elif backend_status == "failed":
                             status_placeholders[scraper_key].write(f"- {error}")
+                        elif backend_status == "timed_out":
+                            status_placeholders[scraper_key].write(f"- ⏱️ {display_name} (délai dépassé, résultats partiels)")
                         else:  # running or other status
                             status_placeholders[scraper_key].write(f"- {in_progress}")
 